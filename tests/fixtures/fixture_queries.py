@@ -0,0 +1,21 @@
+from contextlib import contextmanager
+
+import pytest
+
+# Upper bound of SQL queries per page render, whatever the number of posts.
+QUERY_BUDGETS = {
+    'index': 2,
+    'group_list': 3,
+    'profile': 6,
+    'post_detail': 2,
+    'follow_index': 5,
+}
+
+
+@pytest.fixture
+def query_budget(django_assert_max_num_queries):
+    @contextmanager
+    def budget(view_name):
+        with django_assert_max_num_queries(QUERY_BUDGETS[view_name]) as ctx:
+            yield ctx
+    return budget
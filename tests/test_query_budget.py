@@ -0,0 +1,44 @@
+import pytest
+from django.core.cache import cache
+
+from posts.models import Follow, Post
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def feed_posts(mixer, user, another_user, group):
+    """Twenty text posts per author, so N+1 queries would show up."""
+    Follow.objects.create(user=user, author=another_user)
+    for author in (user, another_user):
+        mixer.cycle(20).blend(Post, author=author, group=group, image='')
+    return Post.objects.filter(author=user).first()
+
+
+class TestQueryBudget:
+
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        cache.clear()
+
+    def test_index(self, client, query_budget, feed_posts):
+        with query_budget('index'):
+            client.get('/')
+
+    def test_group_list(self, client, query_budget, group, feed_posts):
+        with query_budget('group_list'):
+            client.get(f'/group/{group.slug}/')
+
+    def test_profile(self, user_client, query_budget, another_user,
+                     feed_posts):
+        with query_budget('profile'):
+            user_client.get(f'/profile/{another_user.username}/')
+
+    def test_post_detail(self, client, query_budget, mixer, feed_posts):
+        mixer.cycle(10).blend('posts.Comment', post=feed_posts)
+        with query_budget('post_detail'):
+            client.get(f'/posts/{feed_posts.id}/')
+
+    def test_follow_index(self, user_client, query_budget, feed_posts):
+        with query_budget('follow_index'):
+            user_client.get('/follow/')
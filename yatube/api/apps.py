@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class ApiConfig(AppConfig):
+    name = 'api'
+
+    def ready(self):
+        from posts.audit import register
+
+        from .audit import EXPECTED, api_queries
+        register(api_queries, EXPECTED)
@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+
+from posts.audit import FULL_SCAN, pages
+from posts.models import Comment, Follow, Group, Post
+
+from .resources import COMMENTS, FOLLOWS, GROUPS, POSTS, paginator
+
+User = get_user_model()
+
+# The first page of groups walks the table itself in rowid order.
+EXPECTED = {
+    'api groups: page': FULL_SCAN,
+}
+
+
+def api_queries():
+    """Queries issued by the list endpoints, keyed by endpoint."""
+    user = User(pk=1)
+    resources = {
+        'posts': (POSTS, Post.objects.all()),
+        'group posts': (POSTS, Post.objects.filter(group=1)),
+        'author posts': (POSTS, Post.objects.filter(author=1)),
+        'comments': (COMMENTS, Comment.objects.filter(post=1)),
+        'groups': (GROUPS, Group.objects.all()),
+        'follows': (FOLLOWS, Follow.objects.filter(user=user)),
+        'followers': (FOLLOWS, Follow.objects.filter(author=user)),
+    }
+    queries = {}
+    for name, (resource, queryset) in resources.items():
+        resource_paginator = paginator(
+            resource, queryset, list(resource.fields), settings.API_PAGE
+        )
+        after = 1 if resource.keys[0] == 'id' else None
+        queries.update(pages(f'api {name}', resource_paginator, after))
+    return queries
@@ -0,0 +1,140 @@
+"""Read-only JSON representations of the posts models.
+
+A resource maps public field names to ORM paths. Clients pick fields
+with ``?fields=``. Only those columns and the cursor keys are selected,
+with ``values()``, so serializing never builds model instances.
+"""
+from django.conf import settings
+
+from posts.paginators import CursorPaginator, InvalidCursor, encode_cursor
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _media_url(name):
+    return settings.MEDIA_URL + name if name else None
+
+
+class Resource:
+    def __init__(self, fields, keys=('pub_date', 'id'), formats=None):
+        self.fields = fields
+        self.keys = keys
+        self.formats = formats or {}
+
+    def select(self, requested):
+        """Field names asked for in ``fields=``, all of them by default."""
+        if not requested:
+            return list(self.fields)
+        names = [name.strip() for name in requested.split(',')]
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise ApiError(f'Unknown fields: {", ".join(unknown)}')
+        return list(dict.fromkeys(names))
+
+    def values(self, queryset, names):
+        paths = {self.fields[name] for name in names} | set(self.keys)
+        return queryset.values(*paths)
+
+    def dump(self, row, names):
+        record = {}
+        for name in names:
+            value = row[self.fields[name]]
+            if name in self.formats:
+                value = self.formats[name](value)
+            record[name] = value
+        return record
+
+
+POSTS = Resource(
+    {
+        'id': 'id',
+        'pub_date': 'pub_date',
+        'author': 'author__username',
+        'group': 'group__slug',
+        'text': 'text',
+        'excerpt': 'excerpt',
+        'word_count': 'word_count',
+        'image': 'image',
+        'comments_count': 'comments_count',
+    },
+    formats={'image': _media_url},
+)
+COMMENTS = Resource({
+    'id': 'id',
+    'pub_date': 'pub_date',
+    'post': 'post_id',
+    'author': 'author__username',
+    'text': 'text',
+})
+GROUPS = Resource(
+    {
+        'id': 'id',
+        'title': 'title',
+        'slug': 'slug',
+        'description': 'description',
+    },
+    keys=('id', 'id'),
+)
+FOLLOWS = Resource(
+    {
+        'id': 'id',
+        'user': 'user__username',
+        'author': 'author__username',
+    },
+    keys=('id', 'id'),
+)
+
+
+class ValuesPaginator(CursorPaginator):
+    """CursorPaginator over the dicts of a ``values()`` queryset."""
+
+    def encode(self, direction, row):
+        date_key, pk_key = self.keys
+        return encode_cursor(direction, row[date_key], row[pk_key])
+
+
+def _limit(value):
+    if not value:
+        return settings.API_PAGE
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ApiError(f'Invalid limit: {value}')
+    return min(max(limit, 1), settings.API_PAGE_MAX)
+
+
+def paginator(resource, queryset, names, limit):
+    return ValuesPaginator(
+        resource.values(queryset, names), limit, keys=resource.keys
+    )
+
+
+def page(request, resource, queryset):
+    """A chunk of ``queryset`` after ``?cursor=``, newest first."""
+    names = resource.select(request.GET.get('fields'))
+    chunks = paginator(
+        resource, queryset, names, _limit(request.GET.get('limit'))
+    )
+    cursor = request.GET.get('cursor')
+    if cursor:
+        try:
+            chunks.decode(cursor)
+        except InvalidCursor:
+            raise ApiError(f'Invalid cursor: {cursor}')
+    chunk = chunks.get_chunk(cursor)
+    return {
+        'results': [resource.dump(row, names) for row in chunk],
+        'next_cursor': chunk.next_cursor,
+    }
+
+
+def one(request, resource, queryset):
+    names = resource.select(request.GET.get('fields'))
+    row = resource.values(queryset, names).first()
+    if row is None:
+        raise ApiError('Not found', 404)
+    return resource.dump(row, names)
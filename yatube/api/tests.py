@@ -0,0 +1,181 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Change, Comment, Follow, Group, Post
+from posts.paginators import NEXT, encode_cursor
+
+User = get_user_model()
+
+
+class ApiTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author,
+                group=cls.group if number % 2 else None,
+                text=f'Пост {number}',
+            )
+            for number in range(5)
+        ]
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.reader, text='Комментарий'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def get(self, name, *args, **params):
+        return self.client.get(reverse(f'api:{name}', args=args), params)
+
+    @override_settings(API_PAGE=2)
+    def test_posts_are_cursor_paginated(self):
+        ids = []
+        cursor = None
+        while True:
+            params = {'cursor': cursor} if cursor else {}
+            data = self.get('posts', **params).json()
+            ids += [post['id'] for post in data['results']]
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(ids, [post.pk for post in reversed(self.posts)])
+
+    def test_sparse_fields_select_only_their_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            data = self.get('posts', fields='id,author').json()
+        self.assertEqual(
+            data['results'][0], {'id': self.posts[-1].pk, 'author': 'author'}
+        )
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('"posts_post"."text"', queries[0]['sql'])
+
+    def test_cursor_of_another_key_type_is_rejected(self):
+        cursor = encode_cursor(NEXT, 1.5, 3)
+        self.assertEqual(self.get('posts', cursor=cursor).status_code, 400)
+        self.assertEqual(self.get('posts', cursor='junk').status_code, 400)
+
+    def test_unknown_field_is_rejected(self):
+        response = self.get('posts', fields='id,password')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', response.json()['error'])
+
+    def test_filters_by_group_and_author(self):
+        data = self.get('posts', group='group', fields='group').json()
+        self.assertEqual(len(data['results']), 2)
+        self.assertEqual(
+            self.get('posts', author='nobody').status_code, 404
+        )
+
+    def test_batch_reads_posts_in_one_query(self):
+        ids = [self.posts[3].pk, 0, self.posts[1].pk]
+        with CaptureQueriesContext(connection) as queries:
+            data = self.get(
+                'posts_batch', ids=','.join(map(str, ids)), fields='id'
+            ).json()
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(
+            data,
+            {'results': [{'id': ids[0]}, {'id': ids[2]}], 'missing': [0]},
+        )
+
+    def test_post_comments_and_groups(self):
+        post = self.get('post', self.posts[0].pk).json()
+        self.assertEqual(post['text'], 'Пост 0')
+        self.assertEqual(post['comments_count'], 1)
+        comments = self.get('comments', self.posts[0].pk).json()
+        self.assertEqual(comments['results'][0]['author'], 'reader')
+        self.assertEqual(self.get('group', 'group').json()['title'], 'Группа')
+        self.assertEqual(self.get('post', 0).status_code, 404)
+
+    def test_follows_need_a_signed_in_user(self):
+        self.assertEqual(self.get('follows').status_code, 401)
+        self.client.force_login(self.reader)
+        follows = self.get('follows', fields='author').json()
+        self.assertEqual(follows['results'], [{'author': 'author'}])
+        self.assertEqual(self.get('followers').json()['results'], [])
+
+    def test_api_is_read_only(self):
+        response = self.client.post(reverse('api:posts'))
+        self.assertEqual(response.status_code, 405)
+
+
+class SyncTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.other = Group.objects.create(title='Другая', slug='other')
+
+    def sync(self, token=None, **params):
+        if token:
+            params['since'] = token
+        return self.client.get(reverse('api:sync'), params)
+
+    def test_changes_since_token(self):
+        token = self.sync().json()['token']
+        post = Post.objects.create(author=self.author, text='Пост')
+        post.text = 'Исправленный пост'
+        post.save()
+        gone = Post.objects.create(author=self.author, text='Удалю')
+        gone_id = gone.pk
+        gone.delete()
+        data = self.sync(token).json()
+        self.assertEqual(
+            [(c['id'], c['action']) for c in data['changes']],
+            [(post.pk, 'updated'), (gone_id, 'deleted')],
+        )
+        self.assertEqual(data['changes'][0]['data']['text'], post.text)
+        self.assertEqual(self.sync(data['token']).json()['changes'], [])
+
+    def test_group_scope_sees_posts_move_out(self):
+        post = Post.objects.create(
+            author=self.author, group=self.group, text='Пост'
+        )
+        token = self.sync().json()['token']
+        post.group = self.other
+        post.save()
+        group = self.sync(token, scope='group:group').json()['changes']
+        other = self.sync(token, scope='group:other').json()['changes']
+        self.assertEqual(group[0]['action'], 'deleted')
+        self.assertEqual(other[0]['data']['group'], 'other')
+
+    def test_following_scope(self):
+        self.assertEqual(self.sync(scope='following').status_code, 401)
+        self.client.force_login(self.reader)
+        token = self.sync(scope='following').json()['token']
+        Post.objects.create(author=self.reader, text='Свой пост')
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='Пост')
+        changes = self.sync(token, scope='following').json()['changes']
+        self.assertEqual(
+            [(c['type'], c['action']) for c in changes],
+            [('follow', 'created'), ('post', 'created')],
+        )
+        self.assertEqual(changes[1]['id'], post.pk)
+
+    @override_settings(SYNC_LIMIT=1)
+    def test_long_syncs_come_in_parts(self):
+        token = self.sync().json()['token']
+        for number in range(2):
+            Post.objects.create(author=self.author, text=f'Пост {number}')
+        first = self.sync(token).json()
+        self.assertTrue(first['more'])
+        second = self.sync(first['token']).json()
+        self.assertFalse(second['more'])
+        self.assertEqual(len(second['changes']), 1)
+
+    def test_bad_and_expired_tokens(self):
+        self.assertEqual(self.sync('not a token').status_code, 400)
+        token = self.sync().json()['token']
+        for number in range(2):
+            Post.objects.create(author=self.author, text=f'Пост {number}')
+        Change.objects.order_by('pk').first().delete()
+        self.assertEqual(self.sync(token).status_code, 410)
@@ -0,0 +1,183 @@
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+
+from posts import changes
+from posts.models import Change, Comment, Follow, Group, Post
+
+from .resources import (
+    COMMENTS, FOLLOWS, GROUPS, POSTS, ApiError, one, page
+)
+
+User = get_user_model()
+
+
+def api_view(view):
+    """GET-only view returning its dict as JSON and ApiError as
+    ``{"error": ...}``."""
+    @require_GET
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return JsonResponse(view(request, *args, **kwargs))
+        except ApiError as error:
+            return JsonResponse({'error': str(error)}, status=error.status)
+    return wrapper
+
+
+def _pk(queryset, **lookup):
+    pk = queryset.filter(**lookup).values_list('pk', flat=True).first()
+    if pk is None:
+        raise ApiError('Not found', 404)
+    return pk
+
+
+def _signed_in(request):
+    if not request.user.is_authenticated:
+        raise ApiError('Authentication required', 401)
+    return request.user
+
+
+@api_view
+def posts(request):
+    """Newest posts, of one ``group`` (slug) or ``author`` (username)."""
+    queryset = Post.objects.all()
+    slug = request.GET.get('group')
+    if slug:
+        queryset = queryset.filter(group=_pk(Group.objects, slug=slug))
+    username = request.GET.get('author')
+    if username:
+        queryset = queryset.filter(
+            author=_pk(User.objects, username=username)
+        )
+    return page(request, POSTS, queryset)
+
+
+@api_view
+def post(request, post_id):
+    return one(request, POSTS, Post.objects.filter(pk=post_id))
+
+
+@api_view
+def posts_batch(request):
+    """Posts listed in ``ids=`` in that order, read with one query."""
+    try:
+        ids = [int(pk) for pk in request.GET.get('ids', '').split(',')]
+    except ValueError:
+        raise ApiError('ids must be comma separated integers')
+    ids = list(dict.fromkeys(ids))
+    if len(ids) > settings.API_BATCH_SIZE:
+        raise ApiError(f'At most {settings.API_BATCH_SIZE} ids per batch')
+    names = POSTS.select(request.GET.get('fields'))
+    rows = {
+        row['id']: row
+        for row in POSTS.values(Post.objects.filter(pk__in=ids), names)
+    }
+    return {
+        'results': [POSTS.dump(rows[pk], names) for pk in ids if pk in rows],
+        'missing': [pk for pk in ids if pk not in rows],
+    }
+
+
+@api_view
+def comments(request, post_id):
+    post_id = _pk(Post.objects, pk=post_id)
+    return page(request, COMMENTS, Comment.objects.filter(post=post_id))
+
+
+@api_view
+def groups(request):
+    return page(request, GROUPS, Group.objects.all())
+
+
+@api_view
+def group(request, slug):
+    return one(request, GROUPS, Group.objects.filter(slug=slug))
+
+
+@api_view
+def follows(request):
+    """Authors the signed-in user follows."""
+    user = _signed_in(request)
+    return page(request, FOLLOWS, Follow.objects.filter(user=user))
+
+
+@api_view
+def followers(request):
+    """Users following the signed-in user."""
+    user = _signed_in(request)
+    return page(request, FOLLOWS, Follow.objects.filter(author=user))
+
+
+RESOURCES = {
+    Change.POST: (POSTS, Post),
+    Change.COMMENT: (COMMENTS, Comment),
+    Change.FOLLOW: (FOLLOWS, Follow),
+}
+
+
+def _sync_scope(request):
+    scope = request.GET.get('scope', 'global')
+    if scope == 'following':
+        _signed_in(request)
+        return scope
+    if scope.startswith('group:'):
+        return _pk(Group.objects, slug=scope[len('group:'):])
+    if scope != 'global':
+        raise ApiError(f'Unknown scope: {scope}')
+    return scope
+
+
+def _current(latest):
+    """Present state of the objects of ``latest`` changes, by kind."""
+    wanted = {}
+    for change in latest:
+        if change.action != Change.DELETED:
+            wanted.setdefault(change.kind, []).append(change.object_id)
+    found = {}
+    for kind, ids in wanted.items():
+        resource, model = RESOURCES[kind]
+        names = resource.select(None)
+        for row in resource.values(model.objects.filter(pk__in=ids), names):
+            found[kind, row['id']] = resource.dump(row, names)
+    return found
+
+
+@api_view
+def sync(request):
+    """Posts, comments and follows changed in a scope since ``since``.
+
+    Without ``since`` only the current token is returned. Each object
+    appears once, with its last action and, unless deleted, its data.
+    """
+    scope = _sync_scope(request)
+    token = request.GET.get('since')
+    if not token:
+        return {'changes': [], 'token': changes.latest_token(), 'more': False}
+    try:
+        rows, last, more = changes.since(
+            token, scope, request.user, settings.SYNC_LIMIT
+        )
+    except changes.InvalidToken:
+        raise ApiError('Invalid token')
+    except changes.ExpiredToken:
+        raise ApiError('Token expired, sync from scratch', 410)
+    latest = changes.latest_per_object(rows)
+    found = _current(latest)
+    records = []
+    for change in latest:
+        data = found.get((change.kind, change.object_id))
+        records.append({
+            'type': change.kind,
+            'id': change.object_id,
+            'action': change.action if data else Change.DELETED,
+            'data': data,
+        })
+    return {
+        'changes': records,
+        'token': changes.encode_token(last),
+        'more': more,
+    }
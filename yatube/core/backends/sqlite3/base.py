@@ -0,0 +1,21 @@
+"""SQLite backend tuned for a multi-threaded web server.
+
+Every new connection gets the SQLITE_PRAGMAS from settings, and
+``atomic`` blocks start with BEGIN IMMEDIATE: a deferred transaction
+that reads before it writes cannot wait for the write lock and fails
+with "database is locked" instead of honouring the busy timeout.
+"""
+from django.conf import settings
+from django.db.backends.sqlite3 import base
+
+from core.sqlite import apply_pragmas
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        apply_pragmas(connection, settings.SQLITE_PRAGMAS)
+        return connection
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute('BEGIN IMMEDIATE')
@@ -0,0 +1,394 @@
+"""Cache backends shared between worker processes.
+
+``RedisCache`` speaks the Redis protocol over a small connection pool so
+no client library is needed; ``TwoTierCache`` keeps a short-lived
+in-process LRU in front of any other configured cache.
+"""
+import os
+import pickle
+import queue
+import socket
+import threading
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.locmem import LocMemCache
+
+
+class RedisError(Exception):
+    pass
+
+
+class RedisConnection:
+    def __init__(self, host, port, db=0, password=None, timeout=None):
+        self.sock = socket.create_connection((host, port), timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = self.sock.makefile('rb')
+        if password:
+            self.execute('AUTH', password)
+        if db:
+            self.execute('SELECT', db)
+
+    @staticmethod
+    def pack(*args):
+        parts = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode()
+            parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+        return b''.join(parts)
+
+    def read_reply(self):
+        line = self.reader.readline()
+        if not line:
+            raise ConnectionError('Connection closed by cache server')
+        kind, body = line[:1], line[1:-2]
+        if kind == b'+':
+            return body.decode()
+        if kind == b'-':
+            raise RedisError(body.decode())
+        if kind == b':':
+            return int(body)
+        if kind == b'$':
+            length = int(body)
+            if length < 0:
+                return None
+            return self.reader.read(length + 2)[:-2]
+        if kind == b'*':
+            length = int(body)
+            if length < 0:
+                return None
+            return [self.read_reply() for _ in range(length)]
+        raise ConnectionError(f'Unexpected reply from cache server: {line}')
+
+    def execute(self, *args):
+        return self.pipeline([args])[0]
+
+    def pipeline(self, commands):
+        self.sock.sendall(b''.join(self.pack(*args) for args in commands))
+        replies = []
+        error = None
+        for _ in commands:
+            try:
+                replies.append(self.read_reply())
+            except RedisError as exc:
+                error = error or exc
+                replies.append(None)
+        if error:
+            raise error
+        return replies
+
+    def close(self):
+        self.reader.close()
+        self.sock.close()
+
+
+class ConnectionPool:
+    def __init__(self, max_connections=10, **params):
+        self.params = params
+        self.idle = queue.LifoQueue(max_connections)
+
+    def run(self, commands):
+        try:
+            connection = self.idle.get_nowait()
+        except queue.Empty:
+            connection = RedisConnection(**self.params)
+        try:
+            replies = connection.pipeline(commands)
+        except (OSError, ConnectionError):
+            connection.close()
+            raise
+        except RedisError:
+            self.release(connection)
+            raise
+        self.release(connection)
+        return replies
+
+    def release(self, connection):
+        try:
+            self.idle.put_nowait(connection)
+        except queue.Full:
+            connection.close()
+
+    def disconnect(self):
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+# INCRBY alone would recreate a key that expired since the caller saw
+# it, so the existence check runs inside the server in the same step.
+INCR_SCRIPT = (
+    "if redis.call('EXISTS', KEYS[1]) == 1 then "
+    "return redis.call('INCRBY', KEYS[1], ARGV[1]) end"
+)
+
+
+class RedisCache(BaseCache):
+    """Cache backend for a Redis-protocol server.
+
+    LOCATION is ``host:port``; OPTIONS accept ``DB``, ``PASSWORD``,
+    ``SOCKET_TIMEOUT`` and ``MAX_CONNECTIONS``. Pools are shared per
+    process, so every thread reuses the same sockets while a forked
+    worker opens its own instead of inheriting its parent's.
+    """
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, server, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        host, _, port = server.rpartition(':')
+        pool_params = {
+            'host': host or 'localhost',
+            'port': int(port or 6379),
+            'db': options.get('DB', 0),
+            'password': options.get('PASSWORD'),
+            'timeout': options.get('SOCKET_TIMEOUT', 1),
+        }
+        self.max_connections = options.get('MAX_CONNECTIONS', 10)
+        self.pool_params = pool_params
+        self.pool_key = tuple(sorted(pool_params.items()))
+
+    @property
+    def pool(self):
+        pool_key = (os.getpid(), *self.pool_key)
+        pool = _pools.get(pool_key)
+        if pool is None:
+            with _pools_lock:
+                pool = _pools.setdefault(pool_key, ConnectionPool(
+                    self.max_connections, **self.pool_params
+                ))
+        return pool
+
+    def _timeout_args(self, timeout):
+        if timeout == DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None:
+            return ()
+        return ('PX', max(int(timeout * 1000), 1))
+
+    @staticmethod
+    def _expires_now(timeout):
+        return timeout not in (None, DEFAULT_TIMEOUT) and timeout <= 0
+
+    def _encode(self, value):
+        # Plain integers stay readable by the server so INCRBY works.
+        if isinstance(value, int) and not isinstance(value, bool):
+            return str(value).encode()
+        return pickle.dumps(value, self.pickle_protocol)
+
+    @staticmethod
+    def _decode(data):
+        if data[:1].isdigit() or data[:1] == b'-':
+            return int(data)
+        return pickle.loads(data)
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        if self._expires_now(timeout):
+            return False
+        key = self._key(key, version)
+        reply = self.pool.run([(
+            'SET', key, self._encode(value), 'NX',
+            *self._timeout_args(timeout)
+        )])[0]
+        return reply == 'OK'
+
+    def get(self, key, default=None, version=None):
+        data = self.pool.run([('GET', self._key(key, version))])[0]
+        return default if data is None else self._decode(data)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        if self._expires_now(timeout):
+            self.pool.run([('DEL', key)])
+            return
+        self.pool.run([
+            ('SET', key, self._encode(value), *self._timeout_args(timeout))
+        ])
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        args = self._timeout_args(timeout)
+        if not args:
+            replies = self.pool.run([('PERSIST', key), ('EXISTS', key)])
+            return bool(replies[1])
+        return bool(self.pool.run([('PEXPIRE', key, args[1])])[0])
+
+    def delete(self, key, version=None):
+        self.pool.run([('DEL', self._key(key, version))])
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        if not keys:
+            return {}
+        made = [self._key(key, version) for key in keys]
+        values = self.pool.run([('MGET', *made)])[0]
+        return {
+            key: self._decode(value)
+            for key, value in zip(keys, values) if value is not None
+        }
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        if data:
+            self.pool.run([
+                (
+                    'SET', self._key(key, version), self._encode(value),
+                    *self._timeout_args(timeout)
+                )
+                for key, value in data.items()
+            ])
+        return []
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        if keys:
+            self.pool.run([('DEL', *keys)])
+
+    def has_key(self, key, version=None):
+        return bool(self.pool.run([('EXISTS', self._key(key, version))])[0])
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        try:
+            value = self.pool.run([('EVAL', INCR_SCRIPT, 1, key, delta)])[0]
+        except RedisError as exc:
+            raise ValueError(str(exc))
+        if value is None:
+            raise ValueError(f"Key '{key}' not found")
+        return value
+
+    def clear(self):
+        self.pool.run([('FLUSHDB',)])
+
+    def close(self, **kwargs):
+        # Connections are pooled per process and outlive requests.
+        pass
+
+
+class TwoTierCache(BaseCache):
+    """In-process LRU in front of a shared cache alias.
+
+    Reads are answered locally for at most LOCAL_TIMEOUT seconds, so a
+    write made by another worker becomes visible within that window.
+    Keys starting with one of BYPASS_PREFIXES (invalidation counters)
+    always go to the shared tier.
+    """
+
+    def __init__(self, name, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.shared_alias = options['SHARED']
+        self.local_timeout = options.get('LOCAL_TIMEOUT', 5)
+        self.bypass = tuple(options.get('BYPASS_PREFIXES', ()))
+        self.local = LocMemCache(f'two-tier:{name}', {
+            'TIMEOUT': self.local_timeout,
+            'OPTIONS': {
+                'MAX_ENTRIES': options.get('LOCAL_MAX_ENTRIES', 1000),
+                'CULL_FREQUENCY': options.get('LOCAL_CULL_FREQUENCY', 3),
+            },
+        })
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias]
+
+    def _local_timeout(self, timeout):
+        if timeout == DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None:
+            return self.local_timeout
+        return min(timeout, self.local_timeout)
+
+    def _cached_locally(self, key):
+        return not key.startswith(self.bypass)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.shared.add(key, value, timeout, version)
+        if added and self._cached_locally(key):
+            self.local.set(key, value, self._local_timeout(timeout), version)
+        return added
+
+    def get(self, key, default=None, version=None):
+        if not self._cached_locally(key):
+            return self.shared.get(key, default, version)
+        sentinel = object()
+        value = self.local.get(key, sentinel, version)
+        if value is not sentinel:
+            return value
+        value = self.shared.get(key, sentinel, version)
+        if value is sentinel:
+            return default
+        self.local.set(key, value, self.local_timeout, version)
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, timeout, version)
+        if self._cached_locally(key):
+            self.local.set(key, value, self._local_timeout(timeout), version)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, timeout, version)
+
+    def delete(self, key, version=None):
+        self.local.delete(key, version)
+        self.shared.delete(key, version)
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        found = self.local.get_many(
+            [key for key in keys if self._cached_locally(key)], version
+        )
+        missing = [key for key in keys if key not in found]
+        if missing:
+            fetched = self.shared.get_many(missing, version)
+            self.local.set_many(
+                {
+                    key: value for key, value in fetched.items()
+                    if self._cached_locally(key)
+                },
+                self.local_timeout,
+                version,
+            )
+            found.update(fetched)
+        return found
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.shared.set_many(data, timeout, version)
+        self.local.set_many(
+            {
+                key: value for key, value in data.items()
+                if self._cached_locally(key) and key not in failed
+            },
+            self._local_timeout(timeout),
+            version,
+        )
+        return failed
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        self.local.delete_many(keys, version)
+        self.shared.delete_many(keys, version)
+
+    def has_key(self, key, version=None):
+        return self.shared.has_key(key, version)
+
+    def incr(self, key, delta=1, version=None):
+        self.local.delete(key, version)
+        return self.shared.incr(key, delta, version)
+
+    def clear(self):
+        self.local.clear()
+        self.shared.clear()
+
+    def close(self, **kwargs):
+        self.shared.close(**kwargs)
@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.sqlite import STOCK, benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Compares concurrent read/write throughput of stock SQLite '
+        'settings with the tuned ones from settings.py'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--seconds', type=float, default=3.0)
+
+    def handle(self, *args, **options):
+        tuned = {
+            'pragmas': settings.SQLITE_PRAGMAS,
+            'begin': 'BEGIN IMMEDIATE',
+            'timeout': settings.DATABASES['default']['OPTIONS']['timeout'],
+            'reuse_connections': True,
+        }
+        self.stdout.write(f'{"mode":8} {"reads/s":>10} {"writes/s":>10} '
+                          f'{"errors":>8}')
+        for name, mode in (('stock', STOCK), ('tuned', tuned)):
+            result = benchmark(
+                mode,
+                readers=options['readers'],
+                writers=options['writers'],
+                seconds=options['seconds'],
+            )
+            self.stdout.write(
+                f'{name:8} {result["reads"]:10.0f} '
+                f'{result["writes"]:10.0f} {result["errors"]:8}'
+            )
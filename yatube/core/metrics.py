@@ -0,0 +1,268 @@
+"""Per-request performance metrics.
+
+With PERF_METRICS on, PerformanceMiddleware times every request together
+with the SQL queries, cache reads, template renders and thumbnail
+renders made while serving it. The numbers go out in a Server-Timing
+header and are added to per-view totals that ``exposition()`` formats
+for Prometheus. Totals are kept per process.
+
+With the setting off the middleware removes itself at startup, so
+nothing is wrapped and ``timed()`` only reads a thread local.
+"""
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template import engines
+
+PHASES = ('db', 'cache', 'template', 'thumbnail')
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+UNRESOLVED = '<unresolved>'
+
+_state = threading.local()
+_missing = object()
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.seconds = dict.fromkeys(PHASES, 0.0)
+        self.calls = dict.fromkeys(PHASES, 0)
+        self.running = dict.fromkeys(PHASES, False)
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def server_timing(self, total):
+        parts = []
+        for phase in PHASES:
+            if not self.calls[phase]:
+                continue
+            part = f'{phase};dur={self.seconds[phase] * 1000:.1f}'
+            if phase == 'db':
+                part += f';desc="{self.calls[phase]} queries"'
+            elif phase == 'cache':
+                part += (
+                    f';desc="{self.cache_hits} hits, '
+                    f'{self.cache_misses} misses"'
+                )
+            parts.append(part)
+        parts.append(f'total;dur={total * 1000:.1f}')
+        return ', '.join(parts)
+
+
+def current():
+    return getattr(_state, 'metrics', None)
+
+
+@contextmanager
+def timed(phase):
+    """Add the time spent in the block to ``phase`` of the current
+    request. Nested blocks of the same phase count once."""
+    metrics = current()
+    if metrics is None or metrics.running[phase]:
+        yield
+        return
+    metrics.running[phase] = True
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.seconds[phase] += time.perf_counter() - started
+        metrics.calls[phase] += 1
+        metrics.running[phase] = False
+
+
+def _time_query(execute, sql, params, many, context):
+    with timed('db'):
+        return execute(sql, params, many, context)
+
+
+def _instrument_cache(backend):
+    """Count hits and misses of the reads of a cache backend instance.
+
+    Django keeps one instance per alias and thread, so this runs once
+    per thread.
+    """
+    get, get_many = backend.get, backend.get_many
+
+    def timed_get(key, default=None, version=None):
+        metrics = current()
+        if metrics is None or metrics.running['cache']:
+            return get(key, default, version)
+        with timed('cache'):
+            value = get(key, _missing, version)
+        if value is _missing:
+            metrics.cache_misses += 1
+            return default
+        metrics.cache_hits += 1
+        return value
+
+    def timed_get_many(keys, version=None):
+        metrics = current()
+        if metrics is None or metrics.running['cache']:
+            return get_many(keys, version)
+        keys = list(keys)
+        with timed('cache'):
+            found = get_many(keys, version)
+        metrics.cache_hits += len(found)
+        metrics.cache_misses += len(keys) - len(found)
+        return found
+
+    backend.get = timed_get
+    backend.get_many = timed_get_many
+    backend.metrics_instrumented = True
+
+
+class TimedTemplate:
+    def __init__(self, template):
+        self._wrapped = template
+
+    def __getattr__(self, name):
+        return getattr(self._wrapped, name)
+
+    def render(self, context=None, request=None):
+        with timed('template'):
+            return self._wrapped.render(context, request)
+
+
+def _instrument_engine(engine):
+    if getattr(engine, 'metrics_instrumented', False):
+        return
+    get_template, from_string = engine.get_template, engine.from_string
+    engine.get_template = lambda name: TimedTemplate(get_template(name))
+    engine.from_string = lambda code: TimedTemplate(from_string(code))
+    engine.metrics_instrumented = True
+
+
+class ViewTotals:
+    def __init__(self):
+        self.requests = 0
+        self.seconds = 0.0
+        self.buckets = [0] * len(BUCKETS)
+        self.phase_seconds = dict.fromkeys(PHASES, 0.0)
+        self.phase_calls = dict.fromkeys(PHASES, 0)
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def add(self, total, metrics):
+        self.requests += 1
+        self.seconds += total
+        for index, bound in enumerate(BUCKETS):
+            if total <= bound:
+                self.buckets[index] += 1
+        for phase in PHASES:
+            self.phase_seconds[phase] += metrics.seconds[phase]
+            self.phase_calls[phase] += metrics.calls[phase]
+        self.cache_hits += metrics.cache_hits
+        self.cache_misses += metrics.cache_misses
+
+
+_totals = {}
+_totals_lock = threading.Lock()
+
+
+def record(view, total, metrics):
+    with _totals_lock:
+        _totals.setdefault(view, ViewTotals()).add(total, metrics)
+
+
+def reset():
+    with _totals_lock:
+        _totals.clear()
+
+
+def _label(value):
+    return (
+        value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    )
+
+
+def _family(name, kind, help_text):
+    return [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+
+
+def exposition():
+    """Per-view totals in the Prometheus text format."""
+    with _totals_lock:
+        views = [(_label(view), _totals[view]) for view in sorted(_totals)]
+        lines = _family(
+            'yatube_request_duration_seconds', 'histogram',
+            'Time spent serving requests.',
+        )
+        for view, totals in views:
+            for bound, count in zip(BUCKETS, totals.buckets):
+                lines.append(
+                    'yatube_request_duration_seconds_bucket'
+                    f'{{view="{view}",le="{bound}"}} {count}'
+                )
+            lines += [
+                'yatube_request_duration_seconds_bucket'
+                f'{{view="{view}",le="+Inf"}} {totals.requests}',
+                'yatube_request_duration_seconds_sum'
+                f'{{view="{view}"}} {totals.seconds:.6f}',
+                'yatube_request_duration_seconds_count'
+                f'{{view="{view}"}} {totals.requests}',
+            ]
+        lines += _family(
+            'yatube_phase_seconds_total', 'counter',
+            'Time spent in SQL, cache reads, templates and thumbnails.',
+        )
+        lines += [
+            f'yatube_phase_seconds_total{{view="{view}",phase="{phase}"}} '
+            f'{totals.phase_seconds[phase]:.6f}'
+            for view, totals in views for phase in PHASES
+        ]
+        lines += _family(
+            'yatube_phase_calls_total', 'counter',
+            'SQL queries, cache reads, template and thumbnail renders.',
+        )
+        lines += [
+            f'yatube_phase_calls_total{{view="{view}",phase="{phase}"}} '
+            f'{totals.phase_calls[phase]}'
+            for view, totals in views for phase in PHASES
+        ]
+        for outcome in ('hits', 'misses'):
+            lines += _family(
+                f'yatube_cache_{outcome}_total', 'counter',
+                f'Cache reads that were {outcome}.',
+            )
+            lines += [
+                f'yatube_cache_{outcome}_total{{view="{view}"}} '
+                f'{getattr(totals, f"cache_{outcome}")}'
+                for view, totals in views
+            ]
+    return '\n'.join(lines) + '\n'
+
+
+class PerformanceMiddleware:
+    def __init__(self, get_response):
+        if not settings.PERF_METRICS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        for engine in engines.all():
+            _instrument_engine(engine)
+
+    def __call__(self, request):
+        for alias in settings.CACHES:
+            backend = caches[alias]
+            if not getattr(backend, 'metrics_instrumented', False):
+                _instrument_cache(backend)
+        metrics = _state.metrics = RequestMetrics()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(_time_query)
+                    )
+                response = self.get_response(request)
+        finally:
+            _state.metrics = None
+        total = time.perf_counter() - started
+        match = request.resolver_match
+        record(match.view_name if match else UNRESOLVED, total, metrics)
+        response['Server-Timing'] = metrics.server_timing(total)
+        return response
@@ -0,0 +1,91 @@
+"""Routing of reads to database replicas.
+
+Reads go to a replica only while ReplicaRoutingMiddleware is serving a
+safe (GET, HEAD, OPTIONS) request. Writes, unsafe requests, management
+commands and requests from clients that wrote something in the last
+REPLICA_PIN_SECONDS all use the primary, so users always see their own
+changes even while replicas lag behind. A client is pinned after any
+request that wrote, including the GETs that follow and unfollow.
+"""
+import random
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+PIN_COOKIE = 'yatube_primary'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_state = threading.local()
+
+
+def replicas_allowed():
+    return getattr(_state, 'replicas', False)
+
+
+@contextmanager
+def use_replicas(allowed=True):
+    previous = replicas_allowed()
+    _state.replicas = allowed
+    try:
+        yield
+    finally:
+        _state.replicas = previous
+
+
+def use_primary():
+    return use_replicas(False)
+
+
+@contextmanager
+def record_writes():
+    previous = getattr(_state, 'writes', None)
+    _state.writes = writes = []
+    try:
+        yield writes
+    finally:
+        _state.writes = previous
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        if settings.DATABASE_REPLICAS and replicas_allowed():
+            return random.choice(settings.DATABASE_REPLICAS)
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        writes = getattr(_state, 'writes', None)
+        if writes is not None:
+            writes.append(model._meta.label)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive the schema through replication.
+        return db not in settings.DATABASE_REPLICAS
+
+
+class ReplicaRoutingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        safe = request.method in SAFE_METHODS
+        pinned = PIN_COOKIE in request.COOKIES
+        with use_replicas(safe and not pinned), record_writes() as writes:
+            response = self.get_response(request)
+        if (writes or not safe) and settings.DATABASE_REPLICAS:
+            response.set_cookie(
+                PIN_COOKIE,
+                '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
@@ -0,0 +1,16 @@
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    """Runs the tests with thumbnails rendered in the request: pool jobs
+    would outlive the test and its temporary MEDIA_ROOT."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.thumbnails = override_settings(THUMBNAIL_WORKERS=0)
+        self.thumbnails.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.thumbnails.disable()
+        super().teardown_test_environment(**kwargs)
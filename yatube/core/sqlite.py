@@ -0,0 +1,118 @@
+"""SQLite connection tuning and a concurrency benchmark for it."""
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+# What Django uses out of the box: rollback journal, deferred
+# transactions, a 5 second busy timeout and a connection per request.
+STOCK = {
+    'pragmas': {},
+    'begin': 'BEGIN',
+    'timeout': 5,
+    'reuse_connections': False,
+}
+
+
+def apply_pragmas(connection, pragmas):
+    for name, value in pragmas.items():
+        connection.execute(f'PRAGMA {name} = {value}')
+
+
+def _connect(path, mode):
+    connection = sqlite3.connect(
+        path, timeout=mode['timeout'], isolation_level=None,
+        check_same_thread=False,
+    )
+    apply_pragmas(connection, mode['pragmas'])
+    return connection
+
+
+def _prepare(path, rows):
+    with sqlite3.connect(path) as connection:
+        connection.execute(
+            'CREATE TABLE post (id INTEGER PRIMARY KEY, author INTEGER, '
+            'text TEXT, pub_date REAL)'
+        )
+        connection.execute('CREATE INDEX post_date_idx ON post (pub_date)')
+        connection.executemany(
+            'INSERT INTO post (author, text, pub_date) VALUES (?, ?, ?)',
+            ((i % 50, 'x' * 200, i) for i in range(rows)),
+        )
+
+
+def _read(connection):
+    connection.execute(
+        'SELECT id, author, text FROM post ORDER BY pub_date DESC LIMIT 10'
+    ).fetchall()
+
+
+def _write(connection, begin):
+    # Read-then-write, like a view checking something before saving.
+    connection.execute(begin)
+    try:
+        connection.execute('SELECT COUNT(*) FROM post WHERE author = 1')
+        connection.execute(
+            'INSERT INTO post (author, text, pub_date) VALUES (1, ?, ?)',
+            ('y' * 200, time.time()),
+        )
+        connection.execute('COMMIT')
+    except sqlite3.OperationalError:
+        connection.execute('ROLLBACK')
+        raise
+
+
+def _worker(path, mode, operation, deadline, totals, lock):
+    done = failed = 0
+    connection = _connect(path, mode)
+    while time.monotonic() < deadline:
+        if not mode['reuse_connections']:
+            connection.close()
+            connection = _connect(path, mode)
+        try:
+            if operation == 'write':
+                _write(connection, mode['begin'])
+            else:
+                _read(connection)
+            done += 1
+        except sqlite3.OperationalError:
+            failed += 1
+    connection.close()
+    with lock:
+        totals[operation] += done
+        totals['errors'] += failed
+
+
+def benchmark(mode, readers=8, writers=4, seconds=3.0, rows=10000):
+    """Run readers and writers against a scratch database for a while.
+
+    Returns reads/s, writes/s and the number of failed operations.
+    """
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'bench.sqlite3')
+    try:
+        _prepare(path, rows)
+        totals = {'read': 0, 'write': 0, 'errors': 0}
+        lock = threading.Lock()
+        deadline = time.monotonic() + seconds
+        threads = [
+            threading.Thread(
+                target=_worker,
+                args=(path, mode, operation, deadline, totals, lock),
+            )
+            for operation in ['read'] * readers + ['write'] * writers
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        for name in os.listdir(directory):
+            os.remove(os.path.join(directory, name))
+        os.rmdir(directory)
+    return {
+        'reads': totals['read'] / seconds,
+        'writes': totals['write'] / seconds,
+        'errors': totals['errors'],
+    }
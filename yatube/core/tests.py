@@ -1,5 +1,22 @@
+import socketserver
+import threading
+import time
+from unittest import mock
+
 from django.contrib.auth import get_user_model
-from django.test import TestCase, Client
+from django.core.cache import cache
+from django.db import connection, router, transaction
+from django.http import HttpResponse
+from django.test import (
+    Client, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase,
+    override_settings
+)
+from django.test.utils import CaptureQueriesContext
+
+from . import metrics
+from .cache import RedisCache, TwoTierCache
+from .replicas import PIN_COOKIE, ReplicaRoutingMiddleware
+from .sqlite import STOCK, benchmark
 
 
 User = get_user_model()
@@ -14,3 +31,325 @@ class CoreUrlsTest(TestCase):
     def test_404_url_uses_correct_template(self):
         response = self.authorized_client.get('/not_found')
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+class FakeRedisHandler(socketserver.StreamRequestHandler):
+    """Just enough of the Redis protocol for the cache backend."""
+
+    def read_command(self):
+        header = self.rfile.readline()
+        if not header:
+            return None
+        args = []
+        for _ in range(int(header[1:])):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def reply(self, value):
+        if value is None:
+            return b'$-1\r\n'
+        if isinstance(value, int):
+            return b':%d\r\n' % value
+        if isinstance(value, list):
+            return b'*%d\r\n' % len(value) + b''.join(
+                self.reply(item) for item in value
+            )
+        if value == 'OK':
+            return b'+OK\r\n'
+        return b'$%d\r\n%s\r\n' % (len(value), value)
+
+    def handle(self):
+        while True:
+            args = self.read_command()
+            if args is None:
+                return
+            command = args[0].upper().decode()
+            self.server.commands.append(command)
+            handler = getattr(self, f'do_{command.lower()}', self.do_ok)
+            with self.server.lock:
+                self.server.expire()
+                value = handler(self.server.store, *args[1:])
+            self.wfile.write(self.reply(value))
+
+    def do_ok(self, store, *args):
+        return 'OK'
+
+    def do_get(self, store, key):
+        return store.get(key)
+
+    def do_mget(self, store, *keys):
+        return [store.get(key) for key in keys]
+
+    def do_set(self, store, key, data, *options):
+        if b'NX' in options and key in store:
+            return None
+        store[key] = data
+        self.server.expiry.pop(key, None)
+        if b'PX' in options:
+            ms = int(options[options.index(b'PX') + 1])
+            self.server.expiry[key] = time.time() + ms / 1000
+        return 'OK'
+
+    def do_del(self, store, *keys):
+        return sum(store.pop(key, None) is not None for key in keys)
+
+    def do_exists(self, store, key):
+        return int(key in store)
+
+    def do_incrby(self, store, key, delta):
+        value = int(store.get(key, b'0')) + int(delta)
+        store[key] = str(value).encode()
+        return value
+
+    def do_eval(self, store, script, numkeys, key, delta):
+        # Only the conditional increment script is ever sent.
+        if key not in store:
+            return None
+        return self.do_incrby(store, key, delta)
+
+    def do_pexpire(self, store, key, ms):
+        if key not in store:
+            return 0
+        self.server.expiry[key] = time.time() + int(ms) / 1000
+        return 1
+
+    def do_persist(self, store, key):
+        return int(self.server.expiry.pop(key, None) is not None)
+
+    def do_flushdb(self, store):
+        store.clear()
+        return 'OK'
+
+
+class FakeRedisServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), FakeRedisHandler)
+        self.store = {}
+        self.expiry = {}
+        self.commands = []
+        self.lock = threading.Lock()
+
+    def expire(self):
+        now = time.time()
+        for key, deadline in list(self.expiry.items()):
+            if deadline <= now:
+                self.store.pop(key, None)
+                del self.expiry[key]
+
+    @property
+    def location(self):
+        return '%s:%d' % self.server_address
+
+
+class SharedCacheTest(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = FakeRedisServer()
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.store.clear()
+        self.server.commands.clear()
+        self.redis = RedisCache(self.server.location, {'KEY_PREFIX': 'test'})
+
+    def test_redis_round_trip(self):
+        self.redis.set('post', {'id': 1, 'text': 'Текст'})
+        self.assertEqual(self.redis.get('post'), {'id': 1, 'text': 'Текст'})
+        self.assertIn(b'test:1:post', self.server.store)
+        self.assertIsNone(self.redis.get('missing'))
+        self.assertEqual(self.redis.get_many(['post', 'missing']), {
+            'post': {'id': 1, 'text': 'Текст'}
+        })
+        self.redis.delete('post')
+        self.assertFalse(self.redis.has_key('post'))
+
+    def test_redis_add_and_incr(self):
+        self.assertTrue(self.redis.add('counter', 1))
+        self.assertFalse(self.redis.add('counter', 5))
+        self.assertEqual(self.redis.incr('counter'), 2)
+        self.assertEqual(self.redis.get('counter'), 2)
+        with self.assertRaises(ValueError):
+            self.redis.incr('missing')
+        self.assertNotIn(b'test:1:missing', self.server.store)
+        self.assertNotIn('EXISTS', self.server.commands)
+
+    def test_redis_incr_of_expired_key_is_a_miss(self):
+        self.redis.set('counter', 1, 0.05)
+        time.sleep(0.1)
+        with self.assertRaises(ValueError):
+            self.redis.incr('counter')
+        self.assertIsNone(self.redis.get('counter'))
+
+    def test_redis_timeout(self):
+        self.redis.set('short', 'value', 0.05)
+        time.sleep(0.1)
+        self.assertIsNone(self.redis.get('short'))
+
+    def test_redis_reuses_pooled_connections(self):
+        for _ in range(5):
+            self.redis.get('key')
+        self.assertEqual(self.redis.pool.idle.qsize(), 1)
+
+    def test_redis_forked_worker_opens_own_pool(self):
+        parent = self.redis.pool
+        with mock.patch('core.cache.os.getpid', return_value=-1):
+            child = self.redis.pool
+            self.assertIsNot(child, parent)
+            self.assertIs(self.redis.pool, child)
+        self.assertIs(self.redis.pool, parent)
+
+    def test_two_tier_serves_local_copy(self):
+        shared = {
+            'BACKEND': 'core.cache.RedisCache',
+            'LOCATION': self.server.location,
+        }
+        with self.settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'
+        }, 'shared': shared}):
+            two_tier = TwoTierCache('test', {'OPTIONS': {
+                'SHARED': 'shared',
+                'BYPASS_PREFIXES': ['feed_gen:'],
+            }})
+            two_tier.set('card', 'html')
+            two_tier.set('feed_gen:global', 7)
+            self.server.commands.clear()
+            self.assertEqual(two_tier.get('card'), 'html')
+            self.assertEqual(self.server.commands, [])
+            self.server.store.clear()
+            self.assertEqual(two_tier.get('card'), 'html')
+            self.assertIsNone(two_tier.get('feed_gen:global'))
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaRoutingTest(SimpleTestCase):
+    def request(self, method, cookies=None, write=False):
+        seen = {}
+
+        def view(request):
+            seen['read'] = router.db_for_read(User)
+            if write:
+                seen['write'] = router.db_for_write(User)
+            return HttpResponse()
+
+        factory = RequestFactory()
+        for name, value in (cookies or {}).items():
+            factory.cookies[name] = value
+        request = getattr(factory, method)('/')
+        response = ReplicaRoutingMiddleware(view)(request)
+        return seen, response
+
+    def test_safe_requests_read_from_replica(self):
+        seen, response = self.request('get')
+        self.assertEqual(seen, {'read': 'replica1'})
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_safe_requests_that_write_pin_client_to_primary(self):
+        seen, response = self.request('get', write=True)
+        self.assertEqual(seen, {'read': 'replica1', 'write': 'default'})
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+    def test_writes_pin_client_to_primary(self):
+        seen, response = self.request('post')
+        self.assertEqual(seen['read'], 'default')
+        self.assertIn(PIN_COOKIE, response.cookies)
+        seen, _ = self.request('get', {PIN_COOKIE: '1'})
+        self.assertEqual(seen['read'], 'default')
+
+    def test_reads_outside_requests_use_primary(self):
+        self.assertEqual(router.db_for_read(User), 'default')
+
+    def test_related_reads_stay_on_instance_database(self):
+        user = User(username='replicated')
+        user._state.db = 'replica1'
+        self.assertEqual(
+            router.db_for_read(User, instance=user), 'replica1'
+        )
+
+
+class SqliteTuningTest(TransactionTestCase):
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_are_applied(self):
+        self.assertEqual(self.pragma('synchronous'), 1)
+        self.assertEqual(self.pragma('cache_size'), -64 * 1024)
+
+    def test_atomic_takes_write_lock_upfront(self):
+        with CaptureQueriesContext(connection) as queries:
+            with transaction.atomic():
+                User.objects.exists()
+        self.assertEqual(queries[0]['sql'], 'BEGIN IMMEDIATE')
+
+    def test_benchmark_reports_throughput(self):
+        result = benchmark(STOCK, readers=1, writers=1, seconds=0.2)
+        self.assertGreater(result['reads'], 0)
+        self.assertGreater(result['writes'], 0)
+
+
+class PerformanceMetricsTest(TestCase):
+    def setUp(self):
+        metrics.reset()
+        cache.clear()
+
+    def test_disabled_middleware_adds_nothing(self):
+        response = Client().get('/')
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(Client().get('/metrics/').status_code, 404)
+
+    @override_settings(PERF_METRICS=True)
+    def test_server_timing_lists_phases(self):
+        response = Client().get('/')
+        timing = response['Server-Timing']
+        self.assertIn('db;dur=', timing)
+        self.assertIn('template;dur=', timing)
+        self.assertRegex(
+            timing, r'cache;dur=[\d.]+;desc="\d+ hits, \d+ misses"'
+        )
+        self.assertRegex(timing, r'total;dur=[\d.]+$')
+
+    @override_settings(PERF_METRICS=True, PERF_METRICS_TOKEN='secret')
+    def test_totals_are_exposed_per_view(self):
+        client = Client()
+        client.get('/')
+        client.get('/')
+        response = client.get(
+            '/metrics/', HTTP_AUTHORIZATION='Bearer secret'
+        )
+        self.assertEqual(response.status_code, 200)
+        text = response.content.decode()
+        self.assertIn(
+            'yatube_request_duration_seconds_count{view="posts:index"} 2',
+            text,
+        )
+        self.assertRegex(
+            text,
+            r'yatube_phase_calls_total\{view="posts:index",phase="db"\} '
+            r'[1-9]',
+        )
+        self.assertIn('# TYPE yatube_cache_hits_total counter', text)
+
+    @override_settings(PERF_METRICS=True, PERF_METRICS_TOKEN='secret')
+    def test_metrics_need_the_token(self):
+        self.assertEqual(Client().get('/metrics/').status_code, 404)
+        response = Client().get(
+            '/metrics/', HTTP_AUTHORIZATION='Bearer secret'
+        )
+        self.assertEqual(response.status_code, 200)
+        with self.settings(PERF_METRICS_TOKEN=''):
+            response = Client().get(
+                '/metrics/', HTTP_AUTHORIZATION='Bearer '
+            )
+            self.assertEqual(response.status_code, 404)
@@ -1,5 +1,11 @@
+import hmac
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
 from django.shortcuts import render
 
+from .metrics import exposition
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path}, status=404)
@@ -15,3 +21,20 @@ def server_error(request):
 
 def permission_denied(request, exception):
     return render(request, 'core/403.html', status=403)
+
+
+def _may_scrape(request):
+    # REMOTE_ADDR is the proxy's address behind one, so only the token
+    # tells scrapers apart; without it the endpoint stays closed.
+    token = settings.PERF_METRICS_TOKEN
+    return bool(token) and hmac.compare_digest(
+        request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}'
+    )
+
+
+def metrics(request):
+    if not settings.PERF_METRICS or not _may_scrape(request):
+        raise Http404
+    return HttpResponse(
+        exposition(), content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
@@ -0,0 +1,92 @@
+"""Queries checked by ``audit_indexes``.
+
+The posts feeds are listed here; other apps add theirs with
+``register()`` from their ``AppConfig.ready()``, so this app never
+imports them.
+"""
+import re
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from .changes import scope_changes
+from .models import Post
+from .paginators import NEXT, CursorPaginator
+from .search import SEARCH_KEYS, find_posts
+from .timeline import FEED_KEYS, followed_posts
+from .views import comments_paginator
+
+User = get_user_model()
+
+FULL_SCAN = re.compile(r'\bSCAN (TABLE )?\w+$')
+TEMP_SORT = re.compile(r'\bUSE TEMP B-TREE\b')
+
+# Plan lines some queries cannot avoid: search results are sorted by
+# rank and the following scope merges one index range per followed
+# author, both in a temporary B-tree.
+EXPECTED = {
+    'search: page': TEMP_SORT,
+    'search: cursor': TEMP_SORT,
+    'sync: following': TEMP_SORT,
+}
+
+_sources = []
+
+
+def register(source, expected=None):
+    """Add ``source()``, a function returning querysets keyed by name,
+    with the plan lines ``expected`` for some of those names."""
+    _sources.append(source)
+    EXPECTED.update(expected or {})
+
+
+def pages(name, paginator, after=None):
+    """The first page of ``paginator`` and the page past a cursor at
+    ``after`` (now by default), built as the views build them."""
+    if after is None:
+        after = timezone.now()
+    per_page = paginator.per_page
+    return {
+        f'{name}: page': paginator.object_list[:per_page],
+        f'{name}: cursor': paginator.seek(NEXT, after, 1)[:per_page + 1],
+    }
+
+
+def feed_queries():
+    """Queries issued by each feed view, keyed by view name."""
+    user = User(pk=1)
+    feeds = {
+        'index': (Post.objects.feed(), None, None),
+        'group_list': (Post.objects.feed().filter(group=1), None, None),
+        'profile': (Post.objects.feed().filter(author=1), None, None),
+        'follow_index': (followed_posts(user), FEED_KEYS, None),
+        'search': (find_posts('audit'), SEARCH_KEYS, 0.0),
+    }
+    queries = {}
+    for name, (queryset, keys, after) in feeds.items():
+        paginator = CursorPaginator(queryset, settings.PAGE, keys=keys)
+        queries.update(pages(name, paginator, after))
+    queries.update(pages(
+        'post_detail: comments', comments_paginator(Post(pk=1))
+    ))
+    for scope in ('global', 'following', 1):
+        queries[f'sync: {scope}'] = scope_changes(
+            scope, user, 0
+        )[:settings.SYNC_LIMIT + 1]
+    return queries
+
+
+def audited_queries():
+    queries = feed_queries()
+    for source in _sources:
+        queries.update(source())
+    return queries
+
+
+def plan_problems(plan, expected=None):
+    return [
+        line.strip() for line in plan.splitlines()
+        if (FULL_SCAN.search(line.strip()) or TEMP_SORT.search(line))
+        and not (expected and expected.search(line.strip()))
+    ]
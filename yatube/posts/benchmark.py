@@ -0,0 +1,246 @@
+"""Latency and throughput benchmarks of the posts views.
+
+The ``bench_views`` command seeds a scratch database with
+``posts.seeding``, runs every scenario through the test client (latency
+percentiles, queries per request, peak RSS), then replays the read
+scenarios against a threaded WSGI server, and compares the results with
+a baseline file.
+"""
+import random
+import socketserver
+import statistics
+import threading
+import time
+import urllib.request
+from collections import namedtuple
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+from django.contrib.auth import get_user_model
+from django.core.wsgi import get_wsgi_application
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.http import urlencode
+
+from .models import Group, Post
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+User = get_user_model()
+
+Scenario = namedtuple('Scenario', 'name method url login data')
+
+
+def scenarios(seed=0):
+    """One Scenario per posts URL, picking seeded random targets."""
+    users = list(User.objects.values_list('username', flat=True)[:100])
+    slugs = list(Group.objects.values_list('slug', flat=True))
+    posts = list(Post.objects.values_list('pk', flat=True)[:500])
+    rng = random.Random(seed)
+    reader = users[0]
+
+    def pick(values):
+        return lambda: rng.choice(values)
+
+    user, slug, post = pick(users), pick(slugs), pick(posts)
+    return [
+        Scenario('index', 'get', lambda: reverse('posts:index'), None,
+                 None),
+        Scenario('index_page_50', 'get',
+                 lambda: reverse('posts:index') + '?page=50', None, None),
+        Scenario('group_list', 'get',
+                 lambda: reverse('posts:group_list', args=[slug()]),
+                 None, None),
+        Scenario('profile', 'get',
+                 lambda: reverse('posts:profile', args=[user()]),
+                 None, None),
+        Scenario('post_detail', 'get',
+                 lambda: reverse('posts:post_detail', args=[post()]),
+                 None, None),
+        Scenario('search', 'get',
+                 lambda: reverse('posts:search') + '?' + urlencode({
+                     'q': rng.choice(('дом', 'время', 'жизнь', 'работа'))
+                 }), None, None),
+        Scenario('follow_index', 'get', lambda: reverse('posts:follow_index'),
+                 reader, None),
+        Scenario('post_create', 'get', lambda: reverse('posts:post_create'),
+                 reader, None),
+        Scenario('add_comment', 'post',
+                 lambda: reverse('posts:add_comment', args=[post()]),
+                 reader, lambda: {'text': 'Комментарий из бенчмарка'}),
+        Scenario('profile_follow', 'get',
+                 lambda: reverse('posts:profile_follow', args=[user()]),
+                 reader, None),
+        Scenario('profile_unfollow', 'get',
+                 lambda: reverse('posts:profile_unfollow', args=[user()]),
+                 reader, None),
+    ]
+
+
+def percentiles(samples):
+    """p50/p95/p99 of latencies in seconds, as milliseconds."""
+    if len(samples) < 2:
+        samples = list(samples) * 2 or [0.0, 0.0]
+    cuts = statistics.quantiles(samples, n=100, method='inclusive')
+    return {
+        'p50_ms': round(cuts[49] * 1000, 2),
+        'p95_ms': round(cuts[94] * 1000, 2),
+        'p99_ms': round(cuts[98] * 1000, 2),
+    }
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def _client(login):
+    client = Client()
+    if login:
+        client.force_login(User.objects.get(username=login))
+    return client
+
+
+def run_client(scenario_list, iterations=50, warmup=5):
+    """Run each scenario through the test client."""
+    results = {}
+    for scenario in scenario_list:
+        client = _client(scenario.login)
+        for _ in range(warmup):
+            _request(client, scenario)
+        latencies = []
+        queries = 0
+        for _ in range(iterations):
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                _request(client, scenario)
+                latencies.append(time.perf_counter() - started)
+            queries += len(captured)
+        results[scenario.name] = {
+            **percentiles(latencies),
+            'queries': round(queries / iterations, 1),
+            'rss_mb': peak_rss_mb(),
+        }
+    return results
+
+
+def _request(client, scenario):
+    data = scenario.data() if scenario.data else None
+    response = getattr(client, scenario.method)(scenario.url(), data)
+    if response.status_code >= 400:
+        raise RuntimeError(
+            f'{scenario.name} answered {response.status_code}'
+        )
+    return response
+
+
+class _ThreadingWSGIServer(socketserver.ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def _session_cookies(scenario_list):
+    cookies = {}
+    for scenario in scenario_list:
+        if scenario.login and scenario.login not in cookies:
+            cookies[scenario.login] = _client(scenario.login).cookies.output(
+                attrs=[], header='', sep=';'
+            ).strip()
+    return cookies
+
+
+def run_concurrent(scenario_list, threads=8, seconds=5.0):
+    """Replay the GET scenarios against a threaded WSGI server."""
+    server = make_server(
+        '127.0.0.1', 0, get_wsgi_application(),
+        server_class=_ThreadingWSGIServer, handler_class=_QuietHandler,
+    )
+    base = f'http://127.0.0.1:{server.server_port}'
+    serving = threading.Thread(target=server.serve_forever, daemon=True)
+    serving.start()
+    cookies = _session_cookies(scenario_list)
+    reads = [s for s in scenario_list if s.method == 'get']
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+
+    def worker(number):
+        rng = random.Random(number)
+        while time.monotonic() < deadline:
+            scenario = rng.choice(reads)
+            request = urllib.request.Request(base + scenario.url())
+            if scenario.login:
+                request.add_header('Cookie', cookies[scenario.login])
+            started = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request) as response:
+                    response.read()
+            except OSError as error:
+                with lock:
+                    errors.append(f'{scenario.name}: {error}')
+                continue
+            with lock:
+                latencies.append(time.perf_counter() - started)
+
+    workers = [
+        threading.Thread(target=worker, args=(number,))
+        for number in range(threads)
+    ]
+    try:
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+    finally:
+        server.shutdown()
+        server.server_close()
+    return {
+        **percentiles(latencies),
+        'requests_per_s': round(len(latencies) / seconds, 1),
+        'errors': len(errors),
+        'rss_mb': peak_rss_mb(),
+    }
+
+
+def compare(results, baseline, tolerance=0.5):
+    """Regressions of ``results`` against ``baseline``, as messages.
+
+    More queries per request always count; latency only when p95 is
+    more than ``tolerance`` above the baseline. Query counts are
+    averages over randomly picked targets, so they are only compared
+    between runs of as many iterations.
+    """
+    problems = []
+    same_targets = results.get('iterations') == baseline.get('iterations')
+    for name, old in baseline.get('client', {}).items():
+        new = results.get('client', {}).get(name)
+        if new is None:
+            continue
+        if same_targets and new['queries'] > old['queries']:
+            problems.append(
+                f'{name}: {new["queries"]} queries, was {old["queries"]}'
+            )
+        if new['p95_ms'] > old['p95_ms'] * (1 + tolerance):
+            problems.append(
+                f'{name}: p95 {new["p95_ms"]} ms, was {old["p95_ms"]} ms'
+            )
+    old = baseline.get('concurrent')
+    new = results.get('concurrent')
+    if old and new and (
+        new['requests_per_s'] < old['requests_per_s'] * (1 - tolerance)
+    ):
+        problems.append(
+            f'concurrent: {new["requests_per_s"]} req/s, '
+            f'was {old["requests_per_s"]} req/s'
+        )
+    return problems
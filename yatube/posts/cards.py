@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.template.loader import render_to_string
+
+from .models import Post
+from .thumbnails import is_pending
+
+CARD_TEMPLATE = 'includes/post_card.html'
+
+
+def card_key(post):
+    return f'post_card:{post.pk}:{post.version}'
+
+
+def render_card(post):
+    key = card_key(post)
+    html = cache.get(key)
+    if html is None:
+        html = render_to_string(CARD_TEMPLATE, {'post': post})
+        # A card rendered while its thumbnail is pending shows the
+        # original image; keep it out of the cache until the job is done.
+        if not (post.image and is_pending(post.image.name)):
+            cache.set(key, html, settings.POST_CARD_TIMEOUT)
+    return html
+
+
+def invalidate_cards(**lookup):
+    """Bump the version of matching posts so their cached cards expire."""
+    Post.objects.filter(**lookup).update(version=F('version') + 1)
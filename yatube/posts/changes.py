@@ -0,0 +1,174 @@
+"""Change log of posts, comments and follows for delta sync.
+
+Signals append a Change row for every create, edit and delete, tagged
+with the author and group of the post involved. Syncing a scope after
+a token is then a range scan of the (author|group|user, id) indexes, so
+a poll costs as much as the changes it returns, never a feed render.
+
+Tokens are Change ids. They only grow, and rows become visible in id
+order because SQLite runs one write transaction at a time. Bulk loads
+(``import_content``, ``seed``) log a single RESYNC row instead of a
+change per object; tokens older than the last one are expired, as are
+tokens older than the pruned part of the log, so clients know to sync
+from scratch.
+"""
+import base64
+import binascii
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Change, Comment, Follow, Post
+
+PRUNE_BATCH = 10000
+
+
+class InvalidToken(Exception):
+    pass
+
+
+class ExpiredToken(Exception):
+    pass
+
+
+def encode_token(pk):
+    raw = f'c{pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_token(token):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        if not raw.startswith('c'):
+            raise ValueError(raw)
+        return int(raw[1:])
+    except (binascii.Error, UnicodeError, ValueError):
+        raise InvalidToken(token)
+
+
+def log_post(post, action, previous_group_id=None):
+    changes = []
+    if previous_group_id and previous_group_id != post.group_id:
+        # Readers of the old group see the post leave it.
+        changes.append(Change(
+            kind=Change.POST, action=Change.DELETED, object_id=post.pk,
+            author_id=post.author_id, group_id=previous_group_id,
+        ))
+    changes.append(Change(
+        kind=Change.POST, action=action, object_id=post.pk,
+        author_id=post.author_id, group_id=post.group_id,
+    ))
+    Change.objects.bulk_create(changes)
+
+
+def log_comment(comment, action):
+    if Comment.post.is_cached(comment):
+        post = (comment.post.author_id, comment.post.group_id)
+    else:
+        post = Post.objects.filter(pk=comment.post_id).values_list(
+            'author_id', 'group_id'
+        ).first() or (None, None)
+    Change.objects.create(
+        kind=Change.COMMENT, action=action, object_id=comment.pk,
+        author_id=post[0], group_id=post[1],
+    )
+
+
+def log_follow(follow, action):
+    Change.objects.create(
+        kind=Change.FOLLOW, action=action, object_id=follow.pk,
+        author_id=follow.author_id, user_id=follow.user_id,
+    )
+
+
+def log_resync():
+    Change.objects.create(
+        kind=Change.RESYNC, action=Change.CREATED, object_id=0
+    )
+
+
+def floor():
+    """The oldest token still accepted."""
+    oldest = Change.objects.order_by('pk').values_list(
+        'pk', flat=True
+    ).first()
+    resync = Change.objects.filter(kind=Change.RESYNC).order_by(
+        '-pk'
+    ).values_list('pk', flat=True).first()
+    return max((oldest or 1) - 1, resync or 0)
+
+
+def latest_token():
+    pk = Change.objects.order_by('-pk').values_list('pk', flat=True).first()
+    return encode_token(pk or 0)
+
+
+def _scope_filter(scope, user):
+    if scope == 'global':
+        return ~Q(kind__in=(Change.FOLLOW, Change.RESYNC))
+    if scope == 'following':
+        authors = Follow.objects.filter(user=user).values('author')
+        return Q(
+            kind__in=(Change.POST, Change.COMMENT), author_id__in=authors
+        ) | Q(kind=Change.FOLLOW, user_id=user.pk)
+    # A group pk; follows have no group.
+    return Q(group_id=scope)
+
+
+def scope_changes(scope, user, after):
+    return Change.objects.filter(
+        _scope_filter(scope, user), pk__gt=after
+    ).order_by('pk')
+
+
+def since(token, scope, user=None, limit=None):
+    """Changes of ``scope`` after ``token``, oldest first.
+
+    ``scope`` is 'global' (posts and comments), 'following' (posts and
+    comments of the authors ``user`` follows, and their own follows) or
+    a group pk. Returns up to ``limit`` Change rows, the last id read
+    and whether more rows are waiting.
+    """
+    after = decode_token(token)
+    if after < floor():
+        raise ExpiredToken(token)
+    limit = limit or settings.SYNC_LIMIT
+    rows = list(scope_changes(scope, user, after)[:limit + 1])
+    more = len(rows) > limit
+    rows = rows[:limit]
+    return rows, rows[-1].pk if rows else after, more
+
+
+def latest_per_object(rows):
+    """The last change of each object, in the order of those changes."""
+    last = {}
+    for change in rows:
+        key = (change.kind, change.object_id)
+        last.pop(key, None)
+        last[key] = change
+    return list(last.values())
+
+
+def prune(days=None):
+    """Delete changes older than ``days`` (CHANGE_LOG_DAYS).
+
+    The newest row is always kept: it is the floor of the tokens still
+    accepted and the token given to new clients.
+    """
+    days = settings.CHANGE_LOG_DAYS if days is None else days
+    cutoff = timezone.now() - timedelta(days=days)
+    newest = Change.objects.order_by('-pk').values_list(
+        'pk', flat=True
+    ).first()
+    deleted = 0
+    while True:
+        batch = list(
+            Change.objects.filter(created__lt=cutoff, pk__lt=newest)
+            .order_by('pk').values_list('pk', flat=True)[:PRUNE_BATCH]
+        )
+        if not batch:
+            return deleted
+        deleted += Change.objects.filter(pk__in=batch).delete()[0]
@@ -0,0 +1,87 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import (
+    Count, F, IntegerField, OuterRef, Subquery
+)
+from django.db.models.functions import Coalesce
+
+from .models import AuthorStats, Comment, Follow, Post
+
+User = get_user_model()
+
+
+def stats_for(user):
+    try:
+        return user.stats
+    except AuthorStats.DoesNotExist:
+        return AuthorStats(author=user)
+
+
+def bump_author(author_id, field, delta):
+    stats = AuthorStats.objects.filter(author=author_id)
+    change = {field: F(field) + delta}
+    if delta < 0:
+        # Never resurrect rows of a user being deleted, never go negative.
+        stats.filter(**{f'{field}__gte': -delta}).update(**change)
+        return
+    with transaction.atomic():
+        if not stats.update(**change):
+            AuthorStats.objects.get_or_create(author_id=author_id)
+            stats.update(**change)
+
+
+def bump_post(post_id, delta):
+    posts = Post.objects.filter(pk=post_id)
+    if delta < 0:
+        posts = posts.filter(comments_count__gte=-delta)
+    posts.update(comments_count=F('comments_count') + delta)
+
+
+def _count(queryset, field):
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(total=Count('pk'))
+            .values('total'),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+@transaction.atomic
+def reconcile():
+    """Recompute every counter from the source tables.
+
+    Returns the number of author rows and posts that had drifted.
+    """
+    authors = User.objects.annotate(
+        real_posts=_count(Post.objects, 'author'),
+        real_followers=_count(Follow.objects, 'author'),
+        real_following=_count(Follow.objects, 'user'),
+    ).values_list('pk', 'real_posts', 'real_followers', 'real_following')
+    existing = {
+        stats.author_id: stats for stats in AuthorStats.objects.all()
+    }
+    fixed_authors = 0
+    for pk, posts, followers, following in authors.iterator():
+        stats = existing.get(pk) or AuthorStats(author_id=pk)
+        real = (posts, followers, following)
+        current = (
+            stats.posts_count, stats.followers_count, stats.following_count
+        )
+        if stats.pk in existing and real == current:
+            continue
+        stats.posts_count, stats.followers_count, stats.following_count = (
+            real
+        )
+        stats.save()
+        fixed_authors += 1
+    fixed_posts = Post.objects.annotate(
+        real_comments=_count(Comment.objects, 'post')
+    ).exclude(comments_count=F('real_comments')).update(
+        comments_count=_count(Comment.objects, 'post')
+    )
+    return fixed_authors, fixed_posts
@@ -0,0 +1,8 @@
+from django.conf import settings
+from django.utils.text import Truncator
+
+
+def summarize(text):
+    """Excerpt and word count stored with a post for the feeds."""
+    excerpt = Truncator(text).words(settings.EXCERPT_WORDS, truncate='…')
+    return excerpt, len(text.split())
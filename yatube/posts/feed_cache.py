@@ -0,0 +1,90 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .paginators import CursorPaginator, paginate
+
+GENERATION_KEY = 'feed_gen:{}'
+
+
+def _fresh_generation():
+    # Seeded from the clock so an evicted counter never restarts at a
+    # value that older page entries were stored under.
+    return int(time.time() * 1000)
+
+
+def generation(scope):
+    key = GENERATION_KEY.format(scope)
+    value = cache.get(key)
+    if value is None:
+        cache.add(key, _fresh_generation(), None)
+        value = cache.get(key)
+    return value
+
+
+def bump(*scopes):
+    for scope in scopes:
+        key = GENERATION_KEY.format(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _fresh_generation(), None)
+
+
+def post_scopes(author_id, group_id):
+    scopes = ['global', f'author:{author_id}']
+    if group_id:
+        scopes.append(f'group:{group_id}')
+    return scopes
+
+
+def _page_key(request, scope):
+    cursor = request.GET.get('cursor')
+    if cursor:
+        position = f'c{cursor}'
+    else:
+        position = f'p{request.GET.get("page", "")}'
+    digest = hashlib.md5(position.encode()).hexdigest()
+    return f'feed:{scope}:{generation(scope)}:{digest}'
+
+
+def cached_paginate(request, queryset, scope):
+    """paginate() that remembers which posts make up each page.
+
+    Only the post ids and paging metadata are cached, keyed on the
+    scope's generation which every post create/edit/delete bumps, so a
+    hit never shows a stale feed; the posts themselves are re-read by
+    primary key anyway. Large scopes are
+    counted approximately, see ApproximateCountPaginator.
+    """
+    key = _page_key(request, scope)
+    entry = cache.get(key)
+    if entry is None:
+        page = paginate(request, queryset, count_key=scope)
+        entry = {
+            'ids': [post.pk for post in page.object_list],
+            'number': page.number,
+            'count': None if page.is_cursor else page.paginator.count,
+            'approximate': page.paginator.approximate,
+            'is_cursor': page.is_cursor,
+            'next_cursor': page.next_cursor,
+            'previous_cursor': page.previous_cursor,
+        }
+        cache.set(key, entry, settings.FEED_CACHE_TIMEOUT)
+        return page
+    paginator = CursorPaginator(queryset, settings.PAGE)
+    if entry['count'] is not None:
+        paginator.count = entry['count']
+        paginator.approximate = entry['approximate']
+    posts = queryset.in_bulk(entry['ids'])
+    page = paginator._get_page(
+        [posts[pk] for pk in entry['ids'] if pk in posts],
+        entry['number'],
+        paginator,
+    )
+    page.is_cursor = entry['is_cursor']
+    page.next_cursor = entry['next_cursor']
+    page.previous_cursor = entry['previous_cursor']
+    return page
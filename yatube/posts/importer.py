@@ -0,0 +1,300 @@
+"""Bulk import of content in the format written by posts.export.
+
+Rows are validated and inserted a batch at a time with ``bulk_create``,
+which sends no model signals; counters, the search index, timelines,
+feed caches and the sync change log are brought up to date once by
+``Importer.finish()``.
+Rows whose id already exists are skipped, so an interrupted import can
+simply be run again.
+"""
+import csv
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+from . import changes, counters, feed_cache, search, timeline
+from .cards import invalidate_cards
+from .excerpts import summarize
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+# Kinds are flushed in this order so references resolve within a batch.
+ORDER = ('groups', 'posts', 'comments', 'follows')
+
+
+def read_records(lines, fmt='ndjson', kind=None):
+    """Yield ``(line_number, kind, record)`` from NDJSON or CSV lines."""
+    if fmt == 'csv':
+        for number, row in enumerate(csv.DictReader(lines), start=2):
+            yield number, kind, {
+                key: value if value != '' else None
+                for key, value in row.items()
+            }
+        return
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield number, None, None
+            continue
+        yield number, record.pop('type', kind), record
+
+
+def _int(value):
+    return None if value in (None, '') else int(value)
+
+
+class Importer:
+    def __init__(self, batch_size=1000, images_from=None, workers=4):
+        self.batch_size = batch_size
+        self.images_from = images_from
+        self.pool = ThreadPoolExecutor(max_workers=max(workers, 1))
+        self.pending = {kind: [] for kind in ORDER}
+        self.created = dict.fromkeys(ORDER, 0)
+        self.skipped = dict.fromkeys(ORDER, 0)
+        self.errors = []
+        self.authors = set()
+        self.groups = set()
+        self.commented = set()
+        self.follows = set()
+
+    def add(self, number, kind, record):
+        if kind not in self.pending or not isinstance(record, dict):
+            self.reject(number, 'unreadable record')
+            return
+        self.pending[kind].append((number, record))
+        if len(self.pending[kind]) >= self.batch_size:
+            self.flush()
+
+    def reject(self, number, reason):
+        self.errors.append((number, reason))
+
+    def flush(self):
+        with transaction.atomic():
+            for kind in ORDER:
+                batch, self.pending[kind] = self.pending[kind], []
+                if batch:
+                    getattr(self, f'_import_{kind}')(batch)
+
+    def _new(self, model, batch, kind):
+        """Drop rows without a valid id and rows whose id is taken."""
+        rows = {}
+        for number, record in batch:
+            try:
+                record['id'] = _int(record.get('id'))
+            except ValueError:
+                record['id'] = None
+            if record['id'] is None:
+                self.reject(number, 'missing or invalid id')
+            elif record['id'] in rows:
+                self.reject(number, 'duplicate id')
+            else:
+                rows[record['id']] = (number, record)
+        taken = self._existing(model, rows)
+        self.skipped[kind] += len(taken)
+        return [row for pk, row in rows.items() if pk not in taken]
+
+    def _existing(self, model, ids):
+        return set(model.objects.filter(
+            pk__in={pk for pk in ids if pk is not None}
+        ).values_list('pk', flat=True))
+
+    def _import_groups(self, batch):
+        rows = self._new(Group, batch, 'groups')
+        slugs = set(Group.objects.filter(
+            slug__in=[record.get('slug') for _, record in rows]
+        ).values_list('slug', flat=True))
+        groups = []
+        for number, record in rows:
+            if not record.get('title') or not record.get('slug'):
+                self.reject(number, 'group without title or slug')
+                continue
+            if record['slug'] in slugs:
+                self.reject(number, 'slug already taken')
+                continue
+            slugs.add(record['slug'])
+            groups.append(Group(
+                pk=record['id'],
+                title=record['title'],
+                slug=record['slug'],
+                description=record.get('description') or '',
+            ))
+        Group.objects.bulk_create(groups)
+        self.created['groups'] += len(groups)
+
+    def _import_posts(self, batch):
+        rows = []
+        for number, record in self._new(Post, batch, 'posts'):
+            try:
+                record['author_id'] = _int(record.get('author_id'))
+                record['group_id'] = _int(record.get('group_id'))
+            except ValueError:
+                self.reject(number, 'invalid author or group')
+                continue
+            rows.append((number, record))
+        valid = self._valid_posts(rows)
+        images = {
+            number: self.pool.submit(self._copy_image, record['image'])
+            for number, record, _ in valid if record.get('image')
+        }
+        posts = []
+        for number, record, pub_date in valid:
+            image = images[number].result() if number in images else ''
+            if image is None:
+                self.reject(number, 'image not found, imported without it')
+                image = ''
+            excerpt, word_count = summarize(record['text'])
+            posts.append(Post(
+                pk=record['id'],
+                text=record['text'],
+                excerpt=excerpt,
+                word_count=word_count,
+                author_id=record['author_id'],
+                group_id=record['group_id'],
+                image=image,
+                pub_date=pub_date,
+            ))
+        self._create_dated(Post, posts)
+        self.created['posts'] += len(posts)
+        self.authors.update(post.author_id for post in posts)
+        self.groups.update(post.group_id for post in posts if post.group_id)
+
+    def _valid_posts(self, rows):
+        users = self._existing(User, (r['author_id'] for _, r in rows))
+        groups = self._existing(Group, (r['group_id'] for _, r in rows))
+        valid = []
+        for number, record in rows:
+            pub_date = parse_datetime(record.get('pub_date') or '')
+            if not (record.get('text') or '').strip():
+                self.reject(number, 'post without text')
+            elif record['author_id'] not in users:
+                self.reject(number, 'unknown author')
+            elif record['group_id'] and record['group_id'] not in groups:
+                self.reject(number, 'unknown group')
+            elif pub_date is None:
+                self.reject(number, 'invalid pub_date')
+            else:
+                valid.append((number, record, pub_date))
+        return valid
+
+    def _import_comments(self, batch):
+        rows = []
+        for number, record in self._new(Comment, batch, 'comments'):
+            try:
+                record['post_id'] = _int(record.get('post_id'))
+                record['author_id'] = _int(record.get('author_id'))
+            except ValueError:
+                self.reject(number, 'invalid post or author')
+                continue
+            rows.append((number, record))
+        users = self._existing(User, (r['author_id'] for _, r in rows))
+        posts = self._existing(Post, (r['post_id'] for _, r in rows))
+        comments = []
+        for number, record in rows:
+            pub_date = parse_datetime(record.get('pub_date') or '')
+            if record['post_id'] not in posts:
+                self.reject(number, 'unknown post')
+            elif record['author_id'] not in users:
+                self.reject(number, 'unknown author')
+            elif pub_date is None:
+                self.reject(number, 'invalid pub_date')
+            else:
+                comments.append(Comment(
+                    pk=record['id'],
+                    post_id=record['post_id'],
+                    author_id=record['author_id'],
+                    text=record.get('text') or '',
+                    pub_date=pub_date,
+                ))
+        self._create_dated(Comment, comments)
+        self.created['comments'] += len(comments)
+        self.commented.update(comment.post_id for comment in comments)
+
+    def _import_follows(self, batch):
+        pairs = []
+        for number, record in batch:
+            try:
+                pair = (_int(record['user_id']), _int(record['author_id']))
+            except (KeyError, ValueError):
+                self.reject(number, 'invalid user or author')
+                continue
+            if pair[0] == pair[1]:
+                self.reject(number, 'self-follow')
+                continue
+            pairs.append((number, pair))
+        users = self._existing(User, (id_ for _, p in pairs for id_ in p))
+        followed = set(Follow.objects.filter(
+            user__in=users, author__in=users
+        ).values_list('user', 'author'))
+        follows = []
+        for number, (user_id, author_id) in pairs:
+            if user_id not in users or author_id not in users:
+                self.reject(number, 'unknown user or author')
+            elif (user_id, author_id) in followed:
+                self.skipped['follows'] += 1
+            else:
+                followed.add((user_id, author_id))
+                follows.append(Follow(user_id=user_id, author_id=author_id))
+        # Follow ids are not kept, pairs identify them.
+        Follow.objects.bulk_create(follows)
+        self.created['follows'] += len(follows)
+        self.follows.update(
+            (follow.user_id, follow.author_id) for follow in follows
+        )
+
+    @staticmethod
+    def _create_dated(model, objects):
+        # bulk_create() stamps auto_now_add fields with the current time,
+        # so the original dates are written back afterwards.
+        dates = [obj.pub_date for obj in objects]
+        model.objects.bulk_create(objects)
+        for obj, pub_date in zip(objects, dates):
+            obj.pub_date = pub_date
+        model.objects.bulk_update(objects, ['pub_date'])
+
+    def _copy_image(self, name):
+        if not self.images_from:
+            return name
+        root = os.path.realpath(self.images_from)
+        source = os.path.realpath(os.path.join(root, name))
+        # Names come from the import file: nothing outside images_from
+        # may end up in MEDIA_ROOT.
+        if os.path.commonpath([root, source]) != root:
+            return None
+        if not os.path.isfile(source):
+            return None
+        with open(source, 'rb') as image:
+            return default_storage.save(
+                f'posts/{os.path.basename(name)}', File(image)
+            )
+
+    def finish(self):
+        """Flush what is left and run the maintenance skipped per row."""
+        self.flush()
+        self.pool.shutdown()
+        counters.reconcile()
+        if search.available():
+            search.rebuild()
+        if self.commented:
+            invalidate_cards(pk__in=self.commented)
+        pairs = self.follows | set(
+            Follow.objects.filter(
+                author__in=self.authors
+            ).values_list('user', 'author')
+        )
+        for user_id, author_id in pairs:
+            timeline.backfill(user_id, author_id)
+        scopes = {'global'}
+        scopes.update(f'author:{pk}' for pk in self.authors)
+        scopes.update(f'group:{pk}' for pk in self.groups)
+        feed_cache.bump(*scopes)
+        changes.log_resync()
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from posts.audit import EXPECTED, audited_queries, plan_problems
+
+
+class Command(BaseCommand):
+    help = (
+        'Runs EXPLAIN QUERY PLAN over the feed queries and fails on '
+        'full table scans or temporary B-tree sorts'
+    )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Only SQLite query plans are supported')
+        failed = []
+        for name, queryset in audited_queries().items():
+            plan = queryset.explain()
+            problems = plan_problems(plan, EXPECTED.get(name))
+            status = 'FAIL' if problems else 'ok'
+            self.stdout.write(f'{status:4} {name}')
+            if options['verbosity'] > 1 or problems:
+                for line in plan.splitlines():
+                    self.stdout.write(f'       {line}')
+            if problems:
+                failed.append(name)
+        if failed:
+            raise CommandError(
+                'Unindexed feed queries: ' + ', '.join(failed)
+            )
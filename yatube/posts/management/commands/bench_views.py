@@ -0,0 +1,140 @@
+import json
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (
+    override_settings, setup_test_environment, teardown_test_environment
+)
+
+from posts import benchmark
+from posts.models import Post
+from posts.seeding import Seeder
+
+DEFAULT_BASELINE = os.path.join(
+    settings.BASE_DIR, 'benchmarks', 'baseline.json'
+)
+# Only the scratch database may be read, written or flushed: no shared
+# cache server and no replicas, which create_test_db() leaves alone.
+ISOLATED = {
+    'CACHES': {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+    },
+    'DATABASE_REPLICAS': [],
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Seeds a scratch database and measures latency, queries and RSS '
+        'of every posts view, failing on regressions against a baseline'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database',
+            default=os.path.join(tempfile.gettempdir(), 'yatube-bench.db'),
+            help='Scratch SQLite file, recreated unless --keepdb',
+        )
+        parser.add_argument(
+            '--keepdb', action='store_true',
+            help='Reuse an already seeded scratch database',
+        )
+        parser.add_argument('--posts', type=int, default=20000)
+        parser.add_argument('--users', type=int, default=500)
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--seconds', type=float, default=5.0)
+        parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+        parser.add_argument(
+            '--save-baseline', action='store_true',
+            help='Write the results to the baseline file',
+        )
+        parser.add_argument(
+            '--tolerance', type=float, default=0.5,
+            help='Allowed relative slowdown of p95 and throughput',
+        )
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        connection.settings_dict['TEST']['NAME'] = options['database']
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, keepdb=options['keepdb']
+        )
+        try:
+            with override_settings(**ISOLATED):
+                results = self.run(options)
+        finally:
+            connection.creation.destroy_test_db(
+                old_name, verbosity=0, keepdb=options['keepdb']
+            )
+            teardown_test_environment()
+        self.report(results, options)
+
+    def run(self, options):
+        if not Post.objects.exists():
+            self.stdout.write('Seeding the benchmark database...')
+            Seeder(
+                users=options['users'],
+                groups=20,
+                posts=options['posts'],
+                follows=5,
+            ).run()
+        cache.clear()
+        scenarios = benchmark.scenarios()
+        return {
+            'iterations': options['iterations'],
+            'dataset': {
+                'posts': Post.objects.count(),
+                'users': options['users'],
+            },
+            'client': benchmark.run_client(
+                scenarios, iterations=options['iterations']
+            ),
+            'concurrent': benchmark.run_concurrent(
+                scenarios,
+                threads=options['threads'],
+                seconds=options['seconds'],
+            ),
+        }
+
+    def report(self, results, options):
+        self.stdout.write(
+            f'{"view":18} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} '
+            f'{"queries":>8} {"rss MB":>8}'
+        )
+        rows = dict(results['client'])
+        rows['concurrent'] = results['concurrent']
+        for name, row in rows.items():
+            self.stdout.write(
+                f'{name:18} {row["p50_ms"]:8} {row["p95_ms"]:8} '
+                f'{row["p99_ms"]:8} {row.get("queries", "-"):>8} '
+                f'{row["rss_mb"]:>8}'
+            )
+        concurrent = results['concurrent']
+        self.stdout.write(
+            f'{concurrent["requests_per_s"]} requests/s with '
+            f'{options["threads"]} threads, {concurrent["errors"]} errors'
+        )
+        if options['save_baseline']:
+            os.makedirs(os.path.dirname(options['baseline']), exist_ok=True)
+            with open(options['baseline'], 'w') as baseline:
+                json.dump(results, baseline, indent=2, sort_keys=True)
+            self.stdout.write(f'Saved baseline to {options["baseline"]}')
+            return
+        if not os.path.exists(options['baseline']):
+            return
+        with open(options['baseline']) as baseline:
+            problems = benchmark.compare(
+                results, json.load(baseline), options['tolerance']
+            )
+        if problems:
+            raise CommandError(
+                'Regressions against the baseline:\n' + '\n'.join(problems)
+            )
+        self.stdout.write('No regressions against the baseline')
@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import export
+
+
+class Command(BaseCommand):
+    help = (
+        'Streams groups, posts, comments and follows as NDJSON or CSV '
+        'without loading whole tables into memory'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--kind', action='append', choices=list(export.KINDS),
+            default=[],
+            help='What to export, may be repeated; everything by default',
+        )
+        parser.add_argument(
+            '--format', choices=list(export.FORMATS), default='ndjson'
+        )
+        parser.add_argument(
+            '--since',
+            help='Only posts and comments published since this date',
+        )
+        parser.add_argument(
+            '--after-id', type=int,
+            help='Resume after this id, needs a single --kind',
+        )
+        parser.add_argument('--chunk-size', type=int)
+        parser.add_argument(
+            '--output', help='File to write to instead of stdout'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            chunks = export.stream(
+                options['kind'],
+                options['format'],
+                since=export.parse_since(options['since']),
+                after_id=options['after_id'],
+                chunk_size=options['chunk_size'],
+            )
+        except export.ExportError as error:
+            raise CommandError(error)
+        if not options['output']:
+            out = self.stdout
+            for chunk in chunks:
+                out.write(chunk, ending='')
+            return
+        with open(options['output'], 'w', encoding='utf-8',
+                  newline='') as out:
+            for chunk in chunks:
+                out.write(chunk)
@@ -0,0 +1,67 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.export import KINDS
+from posts.importer import Importer, read_records
+
+
+class Command(BaseCommand):
+    help = (
+        'Imports groups, posts, comments and follows written by '
+        'export_content, a batch at a time'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='NDJSON or CSV file')
+        parser.add_argument(
+            '--format', choices=('ndjson', 'csv'), default='ndjson'
+        )
+        parser.add_argument(
+            '--kind', choices=list(KINDS),
+            help='Kind of every row, required for CSV',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--images-from',
+            help='Directory the post image paths are relative to; images '
+                 'are copied into MEDIA_ROOT/posts/',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Threads copying images',
+        )
+
+    def handle(self, *args, **options):
+        if options['format'] == 'csv' and not options['kind']:
+            raise CommandError('CSV imports need --kind')
+        importer = Importer(
+            batch_size=options['batch_size'],
+            images_from=options['images_from'],
+            workers=options['workers'],
+        )
+        started = time.monotonic()
+        try:
+            with open(options['path'], encoding='utf-8', newline='') as lines:
+                records = read_records(
+                    lines, options['format'], options['kind']
+                )
+                for number, kind, record in records:
+                    importer.add(number, kind, record)
+        except OSError as error:
+            raise CommandError(error)
+        importer.finish()
+        elapsed = time.monotonic() - started
+        for number, reason in importer.errors:
+            self.stderr.write(f'line {number}: {reason}')
+        for kind, created in importer.created.items():
+            skipped = importer.skipped[kind]
+            if created or skipped:
+                self.stdout.write(
+                    f'{kind}: {created} imported, {skipped} already present'
+                )
+        total = sum(importer.created.values())
+        self.stdout.write(
+            f'Imported {total} rows in {elapsed:.1f}s, '
+            f'{len(importer.errors)} problems'
+        )
@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import changes
+
+
+class Command(BaseCommand):
+    help = (
+        'Deletes old rows of the delta sync change log; clients holding '
+        'older tokens have to resync'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.CHANGE_LOG_DAYS,
+            help='Keep changes of this many days',
+        )
+
+    def handle(self, *args, **options):
+        deleted = changes.prune(options['days'])
+        self.stdout.write(f'Deleted {deleted} changes')
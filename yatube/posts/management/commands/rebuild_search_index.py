@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the full-text search index of posts and comments'
+
+    def handle(self, *args, **options):
+        if not search.available():
+            raise CommandError('Full-text search needs SQLite with FTS5')
+        posts, comments = search.rebuild()
+        self.stdout.write(f'Indexed {posts} posts and {comments} comments')
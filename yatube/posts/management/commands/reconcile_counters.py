@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import reconcile
+
+
+class Command(BaseCommand):
+    help = 'Recomputes post, comment and follower counters from scratch'
+
+    def handle(self, *args, **options):
+        authors, posts = reconcile()
+        self.stdout.write(
+            f'Fixed counters of {authors} authors and {posts} posts'
+        )
@@ -0,0 +1,86 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from posts.seeding import Seeder
+
+
+class Command(BaseCommand):
+    help = (
+        'Fills the database with deterministic synthetic users, groups, '
+        'posts, comments and a power-law follow graph'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100000)
+        parser.add_argument('--groups', type=int, default=100)
+        parser.add_argument('--posts', type=int, default=1000000)
+        parser.add_argument(
+            '--comments', type=float, default=1.0,
+            help='Mean comments per post',
+        )
+        parser.add_argument(
+            '--follows', type=float, default=20.0,
+            help='Mean accounts followed per user',
+        )
+        parser.add_argument(
+            '--author-skew', type=float, default=1.1,
+            help='Zipf exponent of posts per author',
+        )
+        parser.add_argument(
+            '--follow-skew', type=float, default=1.1,
+            help='Zipf exponent of followers per author',
+        )
+        parser.add_argument(
+            '--group-share', type=float, default=0.7,
+            help='Share of posts published in a group',
+        )
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='Posts are spread over this many days',
+        )
+        parser.add_argument(
+            '--until',
+            help='Date of the newest post, ISO 8601; defaults to now. '
+                 'Fix it to get identical databases.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument(
+            '--timeline-depth', type=int, default=settings.PAGE,
+            help='Newest posts of each followed author put in a timeline, '
+                 'at most TIMELINE_BACKFILL; 0 skips timelines',
+        )
+        parser.add_argument(
+            '--no-search-index', action='store_true',
+            help='Leave the search index for rebuild_search_index',
+        )
+
+    def handle(self, *args, **options):
+        until = None
+        if options['until']:
+            until = parse_datetime(options['until'])
+            if until is None or until.tzinfo is None:
+                raise CommandError('--until needs a date with a timezone')
+        seeder = Seeder(
+            users=options['users'],
+            groups=options['groups'],
+            posts=options['posts'],
+            comments=options['comments'],
+            follows=options['follows'],
+            author_skew=options['author_skew'],
+            follow_skew=options['follow_skew'],
+            group_share=options['group_share'],
+            days=options['days'],
+            seed=options['seed'],
+            until=until,
+            batch_size=options['batch_size'],
+            timeline_depth=options['timeline_depth'],
+            search_index=not options['no_search_index'],
+            log=self.stdout.write,
+        )
+        started = time.monotonic()
+        seeder.run()
+        self.stdout.write(f'Seeded in {time.monotonic() - started:.1f}s')
@@ -0,0 +1,79 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from sorl.thumbnail import default
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Generates missing post thumbnails in parallel and deletes cached '
+        'thumbnails whose image or post no longer exists'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=settings.THUMBNAIL_WORKERS,
+            help='Worker processes, 0 renders in this process',
+        )
+        parser.add_argument(
+            '--no-cleanup', action='store_true',
+            help='Do not delete orphaned thumbnails',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='List orphaned thumbnails instead of deleting them',
+        )
+
+    @staticmethod
+    def image_names():
+        return set(
+            Post.objects.exclude(image='').order_by()
+            .values_list('image', flat=True)
+        )
+
+    def handle(self, *args, **options):
+        started = timezone.now()
+        names = self.image_names()
+        present = sorted(
+            name for name in names if default.storage.exists(name)
+        )
+        if len(present) < len(names):
+            self.stdout.write(
+                f'{len(names) - len(present)} images are missing on disk'
+            )
+        self.warm(present, options['workers'], options['verbosity'])
+        if not options['no_cleanup']:
+            self.cleanup(started, options['dry_run'], options['verbosity'])
+
+    def warm(self, names, workers, verbosity):
+        started = time.monotonic()
+        failed = 0
+        for name, error in thumbnails.warm(names, workers):
+            if error is not None:
+                failed += 1
+                self.stderr.write(f'{name}: {error}')
+            elif verbosity > 1:
+                self.stdout.write(name)
+        elapsed = time.monotonic() - started
+        rate = len(names) / elapsed if elapsed else 0
+        self.stdout.write(
+            f'Processed {len(names)} images in {elapsed:.1f}s '
+            f'({rate:.1f} images/s), {failed} failed'
+        )
+
+    def cleanup(self, started, dry_run, verbosity):
+        # Posts published during a long warm-up have thumbnails too, so
+        # the images are listed again and newer files are left alone.
+        orphans = thumbnails.remove_orphans(
+            self.image_names(), dry_run=dry_run, before=started
+        )
+        if verbosity > 1 or dry_run:
+            for name in orphans:
+                self.stdout.write(name)
+        action = 'Found' if dry_run else 'Deleted'
+        self.stdout.write(f'{action} {len(orphans)} orphaned thumbnails')
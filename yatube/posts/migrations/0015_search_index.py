@@ -0,0 +1,55 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:04
+
+from django.db import migrations, models
+import django.db.models.deletion
+import posts.models
+
+
+def create_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE posts_search USING fts5("
+        "text, comments, tokenize='unicode61 remove_diacritics 2')"
+    )
+    # Matches in the post itself weigh twice as much as in its comments.
+    schema_editor.execute(
+        "INSERT INTO posts_search(posts_search, rank) "
+        "VALUES('rank', 'bm25(2.0, 1.0)')"
+    )
+    schema_editor.execute(
+        "INSERT INTO posts_search(rowid, text, comments) "
+        "SELECT p.id, p.text, COALESCE(("
+        "SELECT group_concat(c.text, ' ') FROM posts_comment c "
+        "WHERE c.post_id = p.id), '') FROM posts_post p"
+    )
+
+
+def drop_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS posts_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_post_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchEntry',
+            fields=[
+                ('post', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='posts.Post')),
+                ('text', models.TextField()),
+                ('comments', models.TextField()),
+                ('document', posts.models.SearchField(db_column='posts_search')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'posts_search',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(create_search_table, drop_search_table),
+    ]
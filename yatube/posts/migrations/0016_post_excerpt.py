@@ -0,0 +1,46 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:53
+
+from django.db import migrations, models
+from django.utils.text import Truncator
+
+# Frozen copy of posts.excerpts.summarize as of this migration, so later
+# changes to it or to settings.EXCERPT_WORDS don't alter the backfill.
+EXCERPT_WORDS = 50
+
+
+def summarize(text):
+    excerpt = Truncator(text).words(EXCERPT_WORDS, truncate='…')
+    return excerpt, len(text.split())
+
+
+def backfill_excerpts(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    batch = []
+    for post in Post.objects.only('text').iterator(chunk_size=2000):
+        post.excerpt, post.word_count = summarize(post.text)
+        batch.append(post)
+        if len(batch) == 2000:
+            Post.objects.bulk_update(batch, ('excerpt', 'word_count'))
+            batch = []
+    Post.objects.bulk_update(batch, ('excerpt', 'word_count'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='excerpt',
+            field=models.TextField(default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='word_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_excerpts, migrations.RunPython.noop),
+    ]
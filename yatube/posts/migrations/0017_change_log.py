@@ -0,0 +1,38 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_post_excerpt'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Change',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('post', 'post'), ('comment', 'comment'), ('follow', 'follow')], max_length=7)),
+                ('action', models.CharField(choices=[('created', 'created'), ('updated', 'updated'), ('deleted', 'deleted')], max_length=7)),
+                ('object_id', models.PositiveIntegerField()),
+                ('author_id', models.PositiveIntegerField(null=True)),
+                ('group_id', models.PositiveIntegerField(null=True)),
+                ('user_id', models.PositiveIntegerField(null=True)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='change',
+            index=models.Index(fields=['author_id', 'id'], name='change_author_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='change',
+            index=models.Index(fields=['group_id', 'id'], name='change_group_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='change',
+            index=models.Index(fields=['user_id', 'id'], name='change_user_idx'),
+        ),
+    ]
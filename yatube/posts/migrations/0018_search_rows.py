@@ -0,0 +1,75 @@
+# Generated by Django 2.2.16 on 2026-10-18 21:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+import posts.models
+
+
+def create_table(schema_editor, columns, *fills):
+    schema_editor.execute('DROP TABLE IF EXISTS posts_search')
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE posts_search USING fts5({columns}, "
+        "tokenize='unicode61 remove_diacritics 2')"
+    )
+    # Matches in the post itself weigh twice as much as in its comments.
+    schema_editor.execute(
+        "INSERT INTO posts_search(posts_search, rank) "
+        "VALUES('rank', 'bm25(2.0, 1.0)')"
+    )
+    for sql in fills:
+        schema_editor.execute(sql)
+
+
+def split_comment_rows(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    create_table(
+        schema_editor,
+        'text, comments, post_id UNINDEXED',
+        "INSERT INTO posts_search(rowid, post_id, text, comments) "
+        "SELECT id, id, text, '' FROM posts_post",
+        "INSERT INTO posts_search(rowid, post_id, text, comments) "
+        "SELECT -id, post_id, '', text FROM posts_comment",
+    )
+
+
+def join_comment_rows(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    create_table(
+        schema_editor,
+        'text, comments',
+        "INSERT INTO posts_search(rowid, text, comments) "
+        "SELECT p.id, p.text, COALESCE(("
+        "SELECT group_concat(c.text, ' ') FROM posts_comment c "
+        "WHERE c.post_id = p.id), '') FROM posts_post p",
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_change_log'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='SearchEntry',
+        ),
+        migrations.CreateModel(
+            name='SearchEntry',
+            fields=[
+                ('id', models.IntegerField(db_column='rowid', primary_key=True, serialize=False)),
+                ('post', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='search_entries', to='posts.Post')),
+                ('text', models.TextField()),
+                ('comments', models.TextField()),
+                ('document', posts.models.SearchField(db_column='posts_search')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'posts_search',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(split_comment_rows, join_comment_rows),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 2.2.16 on 2026-10-18 22:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_search_rows'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='change',
+            name='kind',
+            field=models.CharField(choices=[('post', 'post'), ('comment', 'comment'), ('follow', 'follow'), ('resync', 'resync')], max_length=7),
+        ),
+        migrations.AddIndex(
+            model_name='change',
+            index=models.Index(fields=['kind', 'id'], name='change_kind_idx'),
+        ),
+    ]
@@ -16,6 +16,13 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    def feed(self):
+        return self.select_related('author', 'group').defer(
+            'text', 'author__password', 'group__description'
+        )
+
+
 class Post(CreatedModel):
     text = models.TextField(
         help_text='Содержание вашего поста',
@@ -42,13 +49,69 @@ class Post(CreatedModel):
         verbose_name='Изображение',
         help_text='Выберите изображение для загрузки'
     )
+    excerpt = models.TextField(default='', editable=False)
+    word_count = models.PositiveIntegerField(default=0, editable=False)
+    comments_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Комментариев'
+    )
+    version = models.PositiveIntegerField(default=1, editable=False)
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(fields=('pub_date',), name='post_date_idx'),
+            models.Index(
+                fields=('author', 'pub_date'), name='post_author_date_idx'
+            ),
+            models.Index(
+                fields=('group', 'pub_date'), name='post_group_date_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text[:settings.CHARS_LIMIT]
 
+    @property
+    def is_excerpt_cut(self):
+        return self.word_count > settings.EXCERPT_WORDS
+
+
+class SearchField(models.TextField):
+    """Hidden FTS5 column named after its table, the target of MATCH."""
+
+
+@SearchField.register_lookup
+class Match(models.Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', lhs_params + rhs_params
+
+
+class SearchEntry(models.Model):
+    """Row of the ``posts_search`` FTS5 table, see posts.search."""
+    id = models.IntegerField(primary_key=True, db_column='rowid')
+    post = models.ForeignKey(
+        Post,
+        related_name='search_entries',
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+    )
+    text = models.TextField()
+    comments = models.TextField()
+    document = SearchField(db_column='posts_search')
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'posts_search'
+
 
 class Comment(CreatedModel):
     post = models.ForeignKey(
@@ -71,6 +134,11 @@ class Comment(CreatedModel):
         ordering = ('-pub_date',)
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(
+                fields=('post', 'pub_date'), name='comment_post_date_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -97,3 +165,100 @@ class Follow(models.Model):
                 check=~models.Q(user=models.F('author')),
                 name='do not selffollow'),
         ]
+        indexes = [
+            models.Index(
+                fields=('author', 'user'), name='follow_author_user_idx'
+            ),
+        ]
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        related_name='timeline',
+        on_delete=models.CASCADE,
+    )
+    post = models.ForeignKey(
+        Post,
+        related_name='timeline_entries',
+        on_delete=models.CASCADE,
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        ordering = ('-pub_date',)
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'post'), name='unique_timeline_entry'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=('user', 'pub_date', 'post'),
+                name='timeline_user_date_idx',
+            ),
+        ]
+
+
+class AuthorStats(models.Model):
+    author = models.OneToOneField(
+        User,
+        primary_key=True,
+        related_name='stats',
+        on_delete=models.CASCADE,
+    )
+    posts_count = models.PositiveIntegerField(default=0)
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Счётчики автора'
+        verbose_name_plural = 'Счётчики авторов'
+
+    def __str__(self):
+        return f'{self.author}: {self.posts_count}'
+
+
+class Change(models.Model):
+    """Row of the change log read by delta sync, see posts.changes.
+
+    Ids of the objects involved are plain numbers so rows outlive them.
+    """
+    POST = 'post'
+    COMMENT = 'comment'
+    FOLLOW = 'follow'
+    # Marks a bulk load that logged nothing: older tokens are expired.
+    RESYNC = 'resync'
+    CREATED = 'created'
+    UPDATED = 'updated'
+    DELETED = 'deleted'
+
+    kind = models.CharField(
+        max_length=7,
+        choices=(
+            (POST, POST), (COMMENT, COMMENT), (FOLLOW, FOLLOW),
+            (RESYNC, RESYNC),
+        ),
+    )
+    action = models.CharField(
+        max_length=7,
+        choices=((CREATED, CREATED), (UPDATED, UPDATED), (DELETED, DELETED)),
+    )
+    object_id = models.PositiveIntegerField()
+    # Author of the post (or followed author), its group, and the
+    # follower of follow rows: what scopes filter on.
+    author_id = models.PositiveIntegerField(null=True)
+    group_id = models.PositiveIntegerField(null=True)
+    user_id = models.PositiveIntegerField(null=True)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=('author_id', 'id'), name='change_author_idx'),
+            models.Index(fields=('group_id', 'id'), name='change_group_idx'),
+            models.Index(fields=('user_id', 'id'), name='change_user_idx'),
+            models.Index(fields=('kind', 'id'), name='change_kind_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.kind} {self.object_id} {self.action}'
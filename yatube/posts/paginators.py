@@ -0,0 +1,222 @@
+import base64
+import binascii
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db.models import DateTimeField
+from django.utils.functional import cached_property
+from django.utils.dateparse import parse_datetime
+
+COUNT_KEY = 'feed_count:{}'
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def encode_cursor(direction, value, pk):
+    if hasattr(value, 'isoformat'):
+        value = value.isoformat()
+    raw = f'{direction}|{value}|{pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Direction, first key (a datetime or a number) and pk of a cursor."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        direction, value, pk = raw.split('|')
+        parsed = parse_datetime(value)
+        value = float(value) if parsed is None else parsed
+        pk = int(pk)
+    except (binascii.Error, UnicodeError, ValueError):
+        raise InvalidCursor(cursor)
+    if direction not in (NEXT, PREVIOUS):
+        raise InvalidCursor(cursor)
+    return direction, value, pk
+
+
+class CursorPaginator(Paginator):
+    """Paginator that can also seek by (pub_date, pk) instead of OFFSET.
+
+    Numbered pages keep working as usual, but every page carries opaque
+    ``next_cursor``/``previous_cursor`` tokens; pages fetched by a token
+    never run COUNT(*) and cost the same however deep they are. Counting
+    stops at ``count_limit`` rows, past it the paginator is ``capped``
+    and only cursors reach further.
+    """
+    keys = ('pub_date', 'pk')
+    approximate = False
+
+    def __init__(self, object_list, per_page, keys=None, count_limit=None,
+                 **kwargs):
+        if keys is not None:
+            self.keys = keys
+        self.count_limit = (
+            settings.PAGINATOR_COUNT_LIMIT if count_limit is None
+            else count_limit
+        )
+        date_key, pk_key = self.keys
+        super().__init__(
+            object_list.order_by(f'-{date_key}', f'-{pk_key}'),
+            per_page,
+            **kwargs
+        )
+
+    def limited_count(self):
+        if not self.count_limit:
+            return self.object_list.count()
+        return self.object_list[:self.count_limit].count()
+
+    @cached_property
+    def count(self):
+        return self.limited_count()
+
+    @property
+    def capped(self):
+        return bool(self.count_limit) and self.count >= self.count_limit
+
+    @cached_property
+    def dated(self):
+        """Whether the first key is a datetime rather than a number."""
+        name = self.keys[0]
+        query = self.object_list.query
+        if name in query.annotations:
+            field = query.annotations[name].output_field
+        else:
+            field = query.get_meta().get_field(name)
+        return isinstance(field, DateTimeField)
+
+    def decode(self, cursor):
+        """decode_cursor() that also rejects cursors of other lists,
+        whose first key has the wrong type."""
+        direction, value, pk = decode_cursor(cursor)
+        if isinstance(value, datetime) != self.dated:
+            raise InvalidCursor(cursor)
+        return direction, value, pk
+
+    def encode(self, direction, obj):
+        date_key, pk_key = self.keys
+        return encode_cursor(
+            direction, getattr(obj, date_key), getattr(obj, pk_key)
+        )
+
+    def get_page(self, number):
+        page = super().get_page(number)
+        page.object_list = list(page.object_list)
+        page.is_cursor = False
+        page.next_cursor = None
+        page.previous_cursor = None
+        has_next = page.has_next() or (
+            (self.capped or self.approximate)
+            and page.number == self.num_pages
+        )
+        if page.object_list and has_next:
+            page.next_cursor = self.encode(NEXT, page.object_list[-1])
+        if page.object_list and page.has_previous():
+            page.previous_cursor = self.encode(PREVIOUS, page.object_list[0])
+        return page
+
+    def seek(self, direction, pub_date, pk):
+        # Written as a range plus an exclusion rather than an OR so the
+        # database can seek straight into the (..., pub_date) index.
+        date_key, pk_key = self.keys
+        if direction == NEXT:
+            return self.object_list.filter(
+                **{f'{date_key}__lte': pub_date}
+            ).exclude(**{date_key: pub_date, f'{pk_key}__gte': pk})
+        return self.object_list.filter(
+            **{f'{date_key}__gte': pub_date}
+        ).exclude(**{date_key: pub_date, f'{pk_key}__lte': pk}).reverse()
+
+    def get_cursor_page(self, cursor):
+        try:
+            direction, pub_date, pk = self.decode(cursor)
+        except InvalidCursor:
+            return self.get_page(1)
+        queryset = self.seek(direction, pub_date, pk)
+        objects = list(queryset[:self.per_page + 1])
+        has_more = len(objects) > self.per_page
+        objects = objects[:self.per_page]
+        if direction == PREVIOUS:
+            if not has_more:
+                return self.get_page(1)
+            objects.reverse()
+        page = self._get_page(objects, None, self)
+        page.is_cursor = True
+        page.next_cursor = None
+        page.previous_cursor = None
+        if objects and (has_more or direction == PREVIOUS):
+            page.next_cursor = self.encode(NEXT, objects[-1])
+        if objects:
+            page.previous_cursor = self.encode(PREVIOUS, objects[0])
+        return page
+
+    def get_chunk(self, cursor=None):
+        """``per_page`` objects after a next-cursor, or the first ones.
+
+        Unlike pages, chunks only go forward and never count, so a chunk
+        costs one indexed query however long the list is.
+        """
+        queryset = self.object_list
+        if cursor:
+            try:
+                direction, pub_date, pk = self.decode(cursor)
+            except InvalidCursor:
+                direction = None
+            if direction == NEXT:
+                queryset = self.seek(direction, pub_date, pk)
+        objects = list(queryset[:self.per_page + 1])
+        page = self._get_page(objects[:self.per_page], None, self)
+        page.is_cursor = True
+        page.previous_cursor = None
+        page.next_cursor = None
+        if len(objects) > self.per_page:
+            page.next_cursor = self.encode(NEXT, page.object_list[-1])
+        return page
+
+
+class ApproximateCountPaginator(CursorPaginator):
+    """CursorPaginator that caches the size of large feeds.
+
+    Feeds shorter than APPROXIMATE_COUNT_THRESHOLD are counted every
+    time. The count of longer ones, bounded by ``count_limit`` like any
+    other, is cached under ``count_key`` for APPROXIMATE_COUNT_TIMEOUT
+    seconds, so the last page may be a little off.
+    """
+
+    def __init__(self, object_list, per_page, count_key, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_key = COUNT_KEY.format(count_key)
+
+    @cached_property
+    def count(self):
+        count = cache.get(self.count_key)
+        if count is None:
+            count = self.limited_count()
+            if count < settings.APPROXIMATE_COUNT_THRESHOLD:
+                return count
+            cache.set(
+                self.count_key, count, settings.APPROXIMATE_COUNT_TIMEOUT
+            )
+        self.approximate = True
+        return count
+
+
+def paginate(request, queryset, keys=None, count_key=None):
+    if count_key is None:
+        paginator = CursorPaginator(queryset, settings.PAGE, keys=keys)
+    else:
+        paginator = ApproximateCountPaginator(
+            queryset, settings.PAGE, count_key, keys=keys
+        )
+    cursor = request.GET.get('cursor')
+    if cursor:
+        return paginator.get_cursor_page(cursor)
+    return paginator.get_page(request.GET.get('page'))
@@ -0,0 +1,102 @@
+"""Full-text search over posts and their comments.
+
+On SQLite every post and every comment is a row of the ``posts_search``
+FTS5 table (see migration 0018) keyed to its post, so a new comment
+costs one insert however long the thread is. Post rows use the post id
+as rowid and comment rows the negated comment id. A post matches when
+it or one of its comments has all the words, and ranks by its best row.
+Signals keep the rows in sync; bulk writes that bypass them are fixed
+with ``manage.py rebuild_search_index``. Other databases fall back to a
+plain substring match.
+"""
+from django.db import connection
+from django.db.models import FloatField, Min, Q, Value
+
+from .models import Post
+
+SEARCH_KEYS = ('search_rank', 'pk')
+
+POST_ROWS_SQL = (
+    'INSERT INTO posts_search(rowid, post_id, text, comments) '
+    "SELECT id, id, text, '' FROM posts_post"
+)
+COMMENT_ROWS_SQL = (
+    'INSERT INTO posts_search(rowid, post_id, text, comments) '
+    "SELECT -id, post_id, '', text FROM posts_comment"
+)
+
+
+def available():
+    return connection.vendor == 'sqlite'
+
+
+def to_query(text):
+    """FTS5 query for user input: all words must match, the last one as
+    a prefix. Words are quoted, so operators and stray quotes are
+    searched for literally instead of failing to parse."""
+    terms = ['"{}"'.format(word.replace('"', '""')) for word in text.split()]
+    if not terms:
+        return ''
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def _refresh(rows_sql, ids, rowids):
+    if not available() or not ids:
+        return
+    placeholders = ', '.join(['%s'] * len(ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM posts_search WHERE rowid IN ({placeholders})',
+            rowids,
+        )
+        cursor.execute(f'{rows_sql} WHERE id IN ({placeholders})', ids)
+
+
+def reindex(*post_ids):
+    """Refresh the rows of the given posts, dropping deleted ones.
+
+    Rows of their comments are left alone, see reindex_comments().
+    """
+    _refresh(POST_ROWS_SQL, post_ids, post_ids)
+
+
+def reindex_comments(*comment_ids):
+    """Refresh the rows of the given comments, dropping deleted ones."""
+    _refresh(
+        COMMENT_ROWS_SQL, comment_ids, [-pk for pk in comment_ids]
+    )
+
+
+def rebuild():
+    """Recreate every row of the index and return how many posts and
+    comments it holds."""
+    with connection.cursor() as cursor:
+        cursor.execute('DELETE FROM posts_search')
+        cursor.execute(POST_ROWS_SQL)
+        posts = cursor.rowcount
+        cursor.execute(COMMENT_ROWS_SQL)
+        comments = cursor.rowcount
+        cursor.execute(
+            "INSERT INTO posts_search(posts_search) VALUES('optimize')"
+        )
+    return posts, comments
+
+
+def matching(queryset, text):
+    """Posts of ``queryset`` matching ``text``, annotated with
+    ``search_rank`` (higher is better)."""
+    query = to_query(text)
+    if not query:
+        return queryset.none()
+    if available():
+        return queryset.filter(
+            search_entries__document__match=query
+        ).annotate(search_rank=-Min('search_entries__rank'))
+    return queryset.filter(
+        Q(text__icontains=text) | Q(comments__text__icontains=text)
+    ).distinct().annotate(search_rank=Value(0.0, FloatField()))
+
+
+def find_posts(text):
+    return matching(Post.objects.feed(), text)
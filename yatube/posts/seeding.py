@@ -0,0 +1,475 @@
+"""Synthetic content for scale testing.
+
+Everything is drawn from one seeded ``random.Random``, so the same
+options always produce the same rows. Activity follows power laws: a few
+authors write most posts and gather most followers, a few posts collect
+most comments, the number of accounts a user follows is Pareto
+distributed.
+
+Rows are generated a column at a time and written with ``executemany``,
+which is an order of magnitude faster than building model instances for
+``bulk_create``. On SQLite the non-unique indexes of the filled tables
+are dropped for the load and rebuilt once at the end. Counters and
+timelines are computed while generating instead of by
+``counters.reconcile()`` and ``timeline.backfill()``.
+"""
+import itertools
+import random
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager
+from datetime import date, timedelta
+from functools import partial
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from faker import Faker
+
+from . import changes, feed_cache, search, timeline
+from .excerpts import summarize
+from .models import AuthorStats, Comment, Follow, Group, Post, TimelineEntry
+
+User = get_user_model()
+
+MODELS = (User, Group, Post, Comment, Follow, AuthorStats, TimelineEntry)
+COMMENT_WINDOW = 7 * 86400
+CHUNK = 10000
+EPOCH = date(1970, 1, 1).toordinal()
+
+
+def zipf_weights(count, skew):
+    """Cumulative weights of ranks ``1..count`` proportional to
+    ``1 / rank ** skew``, for ``random.choices``."""
+    return list(itertools.accumulate(
+        1 / rank ** skew for rank in range(1, count + 1)
+    ))
+
+
+def pareto_counts(rng, mean, size, alpha=2.0):
+    """Non-negative integers with the given mean and a Pareto tail."""
+    if mean <= 0:
+        return [0] * size
+    scale = mean * (alpha - 1) / alpha
+    pareto, uniform = rng.paretovariate, rng.random
+    return [int(scale * pareto(alpha) + uniform()) for _ in range(size)]
+
+
+class Clock:
+    """Text form of whole seconds after ``start``, as the database
+    stores timestamps, without building a datetime per row."""
+
+    def __init__(self, start, days):
+        start = int(start.timestamp())
+        self.offset = start % 86400
+        first = EPOCH + start // 86400
+        self.days = [
+            date.fromordinal(first + day).isoformat() + ' '
+            for day in range(days + 1)
+        ]
+        self.times = [
+            f'{hour:02}:{minute:02}:{second:02}'
+            for hour in range(24)
+            for minute in range(60)
+            for second in range(60)
+        ]
+
+    def format(self, seconds):
+        days, times, offset = self.days, self.times, self.offset
+        return [
+            days[second // 86400] + times[second % 86400]
+            for second in [offset + second for second in seconds]
+        ]
+
+
+class Table:
+    """Prepared multi-row INSERT for a model.
+
+    Rows hold the values of ``fields``; every other concrete field gets
+    its default, computed once. Each statement carries as many rows as
+    the backend accepts parameters for.
+    """
+
+    def __init__(self, model, fields):
+        meta = model._meta
+        named = [meta.get_field(name) for name in fields]
+        rest = [
+            field for field in meta.concrete_fields
+            if field not in named and field is not meta.auto_field
+        ]
+        self.defaults = tuple(
+            field.get_db_prep_save(field.get_default(), connection)
+            for field in rest
+        )
+        self.columns = ', '.join(
+            connection.ops.quote_name(field.column) for field in named + rest
+        )
+        self.table = connection.ops.quote_name(meta.db_table)
+        self.row = '({})'.format(', '.join(['%s'] * (len(named) + len(rest))))
+        max_params = connection.features.max_query_params or 10000
+        self.per_statement = max(1, min(500, max_params // len(
+            named + rest
+        )))
+
+    def sql(self, rows):
+        values = ', '.join([self.row] * rows)
+        return f'INSERT INTO {self.table} ({self.columns}) VALUES {values}'
+
+    def insert(self, rows, batch_size):
+        """Write ``rows`` and return how many there were."""
+        defaults = self.defaults
+        size = self.per_statement
+        full = self.sql(size)
+        rows = iter(rows)
+        written = 0
+        with connection.cursor() as cursor:
+            while True:
+                batch = [
+                    row + defaults
+                    for row in itertools.islice(rows, batch_size)
+                ]
+                if not batch:
+                    return written
+                statements = [
+                    list(itertools.chain.from_iterable(
+                        batch[start:start + size]
+                    ))
+                    for start in range(0, len(batch), size)
+                ]
+                tail = statements.pop() if len(batch) % size else None
+                cursor.executemany(full, statements)
+                if tail:
+                    cursor.execute(self.sql(len(batch) % size), tail)
+                written += len(batch)
+
+
+@contextmanager
+def deferred_indexes(models):
+    """Drop the non-unique indexes of ``models`` and recreate them on
+    exit. Only SQLite keeps the statements needed to do it."""
+    if connection.vendor != 'sqlite':
+        yield
+        return
+    tables = [model._meta.db_table for model in models]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'index' "
+            "AND sql IS NOT NULL AND sql NOT LIKE 'CREATE UNIQUE%%' "
+            f"AND tbl_name IN ({', '.join(['%s'] * len(tables))})",
+            tables,
+        )
+        indexes = cursor.fetchall()
+        for name, _ in indexes:
+            cursor.execute(f'DROP INDEX {connection.ops.quote_name(name)}')
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            for _, sql in indexes:
+                cursor.execute(sql)
+
+
+class Seeder:
+    def __init__(self, users=1000, groups=50, posts=100000, comments=1.0,
+                 follows=20.0, author_skew=1.1, follow_skew=1.1,
+                 group_share=0.7, days=365, seed=0, until=None,
+                 batch_size=10000, timeline_depth=None, search_index=True,
+                 texts=500, log=None):
+        self.users = users
+        self.groups = groups
+        self.posts = posts
+        self.comments = comments
+        self.follows = follows
+        self.author_skew = author_skew
+        self.follow_skew = follow_skew
+        self.group_share = group_share
+        self.until = until or timezone.now()
+        self.start = self.until - timedelta(days=days)
+        self.span = days * 86400
+        self.clock = Clock(self.start, days + 1)
+        self.batch_size = batch_size
+        if timeline_depth is None:
+            timeline_depth = settings.TIMELINE_BACKFILL
+        self.timeline_depth = min(
+            timeline_depth, settings.TIMELINE_BACKFILL
+        )
+        self.search_index = search_index
+        self.log = log or (lambda message: None)
+        self.rng = random.Random(seed)
+        self.fake = Faker('ru_RU')
+        self.fake.seed_instance(seed)
+        self.texts = [
+            self.fake.text(max_nb_chars=self.rng.choice((80, 200, 500)))
+            for _ in range(texts)
+        ]
+        self.summaries = [(text, *summarize(text)) for text in self.texts]
+        self.remarks = [
+            self.fake.sentence(nb_words=self.rng.randint(2, 15))
+            for _ in range(texts)
+        ]
+        self.created = dict.fromkeys(
+            (
+                'users', 'groups', 'follows', 'posts', 'comments', 'stats',
+                'timelines',
+            ),
+            0,
+        )
+        self.posts_count = Counter()
+        self.recent = defaultdict(partial(deque, maxlen=self.timeline_depth))
+
+    def _write(self, kind, model, fields, rows):
+        started = time.monotonic()
+        self.created[kind] = Table(model, fields).insert(
+            rows, self.batch_size
+        )
+        elapsed = time.monotonic() - started
+        self.log(
+            f'{kind}: {self.created[kind]} rows in {elapsed:.1f}s, '
+            f'{self.created[kind] / max(elapsed, 0.001):.0f} rows/s'
+        )
+
+    def _first_id(self, model):
+        return (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+
+    def run(self):
+        """Generate everything and return ``self.created``.
+
+        Seeded rows only refer to each other, so the database may
+        already hold content.
+        """
+        # Rows are consistent by construction; checking every foreign key
+        # would double the time spent writing.
+        with connection.constraint_checks_disabled(), \
+                transaction.atomic(), deferred_indexes(MODELS):
+            self.user_ids = self._seed_users()
+            self.group_ids = self._seed_groups()
+            # Popular authors are both the most active and the most
+            # followed ones.
+            self.ranked = self.rng.sample(self.user_ids, len(self.user_ids))
+            self._seed_follows()
+            self._seed_posts()
+            self._seed_stats()
+            self.log('Rebuilding indexes')
+        if self.timeline_depth and self.user_ids:
+            with connection.constraint_checks_disabled(), \
+                    transaction.atomic(), deferred_indexes([TimelineEntry]):
+                self._seed_timelines()
+        self._reset_sequences()
+        if self.search_index and search.available():
+            self.log('Rebuilding the search index')
+            search.rebuild()
+        cache.delete(timeline.PULL_AUTHORS_KEY)
+        feed_cache.bump('global')
+        changes.log_resync()
+        return self.created
+
+    def _seed_users(self):
+        first = self._first_id(User)
+        ids = range(first, first + self.users)
+        names = [self.fake.first_name() for _ in range(200)]
+        joined = self.clock.format([0])[0]
+        self._write(
+            'users', User,
+            ('id', 'username', 'first_name', 'password', 'date_joined'),
+            zip(
+                ids,
+                (f'user{pk}' for pk in ids),
+                self.rng.choices(names, k=self.users),
+                itertools.repeat('!'),
+                itertools.repeat(joined),
+            ),
+        )
+        return list(ids)
+
+    def _seed_groups(self):
+        first = self._first_id(Group)
+        ids = range(first, first + self.groups)
+        self._write(
+            'groups', Group, ('id', 'title', 'slug', 'description'),
+            (
+                (
+                    pk,
+                    self.fake.sentence(nb_words=3).rstrip('.'),
+                    f'group{pk}',
+                    self.rng.choice(self.texts),
+                )
+                for pk in ids
+            ),
+        )
+        return list(ids)
+
+    def _followed(self, user_id, count, weights):
+        chosen = set()
+        for _ in range(3):
+            chosen.update(self.rng.choices(
+                self.ranked, cum_weights=weights, k=count - len(chosen)
+            ))
+            chosen.discard(user_id)
+            if len(chosen) >= count:
+                break
+        return sorted(chosen)
+
+    def _follow_rows(self):
+        weights = zipf_weights(len(self.ranked), self.follow_skew)
+        limit = len(self.user_ids) - 1
+        counts = pareto_counts(self.rng, self.follows, len(self.user_ids))
+        for user_id, count in zip(self.user_ids, counts):
+            count = min(count, limit)
+            if count:
+                for author_id in self._followed(user_id, count, weights):
+                    yield user_id, author_id
+
+    def _seed_follows(self):
+        self.followers = Counter()
+        self.following = Counter()
+
+        def counted(rows):
+            for user_id, author_id in rows:
+                self.followers[author_id] += 1
+                self.following[user_id] += 1
+                yield user_id, author_id
+
+        self._write(
+            'follows', Follow, ('user', 'author'),
+            counted(self._follow_rows()),
+        )
+
+    def _post_rows(self):
+        """Posts a chunk at a time, each column drawn in one call."""
+        rng = self.rng
+        first = self._first_id(Post)
+        activity = zipf_weights(len(self.ranked), self.author_skew)
+        # None stands for "no group" and takes the remaining share.
+        groups = self.group_ids + [None]
+        popularity = zipf_weights(len(self.group_ids), 1.0)
+        popularity = [
+            weight * self.group_share / popularity[-1]
+            for weight in popularity
+        ] + [1.0] if popularity else [1.0]
+        self.comment_counts = []
+        for offset in range(0, self.posts, CHUNK):
+            size = min(CHUNK, self.posts - offset)
+            ids = range(first + offset, first + offset + size)
+            authors = rng.choices(self.ranked, cum_weights=activity, k=size)
+            dates = self.clock.format(self._seconds(offset, size))
+            counts = pareto_counts(rng, self.comments, size)
+            self.comment_counts.append((ids, authors, counts))
+            self._remember(ids, authors, dates)
+            yield from (
+                (pk, author, group, *text, pub_date, count)
+                for pk, author, group, text, pub_date, count in zip(
+                    ids,
+                    authors,
+                    rng.choices(groups, cum_weights=popularity, k=size),
+                    rng.choices(self.summaries, k=size),
+                    dates,
+                    counts,
+                )
+            )
+
+    def _seconds(self, offset, size):
+        step = self.span / max(self.posts, 1)
+        return [int(step * index) for index in range(offset, offset + size)]
+
+    def _comment_rows(self):
+        """Comments of each chunk of posts, soon after the post."""
+        rng = self.rng
+        offset = 0
+        for ids, authors, counts in self.comment_counts:
+            posts = [
+                (pk, second, min(self.span - second, COMMENT_WINDOW))
+                for pk, second, count in zip(
+                    ids, self._seconds(offset, len(ids)), counts
+                )
+                for _ in range(count)
+            ]
+            offset += len(ids)
+            # Commenters are drawn from the authors of the chunk, so
+            # active users comment more too.
+            yield from zip(
+                [pk for pk, _, _ in posts],
+                rng.choices(authors, k=len(posts)),
+                rng.choices(self.remarks, k=len(posts)),
+                self.clock.format([
+                    second + int(window * rng.random())
+                    for _, second, window in posts
+                ]),
+            )
+
+    def _remember(self, ids, authors, dates):
+        """Count posts per author and keep the newest ones for
+        timelines."""
+        self.posts_count.update(authors)
+        if self.timeline_depth:
+            recent = self.recent
+            for pk, author_id, pub_date in zip(ids, authors, dates):
+                recent[author_id].append((pk, pub_date))
+
+    def _seed_posts(self):
+        # Comment counts are drawn with the posts, so comments_count is
+        # right from the start.
+        self._write(
+            'posts', Post,
+            (
+                'id', 'author', 'group', 'text', 'excerpt', 'word_count',
+                'pub_date', 'comments_count',
+            ),
+            self._post_rows(),
+        )
+        first = self._first_id(Comment)
+        self._write(
+            'comments', Comment, ('id', 'post', 'author', 'text', 'pub_date'),
+            (
+                (pk, *row)
+                for pk, row in enumerate(self._comment_rows(), start=first)
+            ),
+        )
+        del self.comment_counts
+
+    def _seed_stats(self):
+        self._write(
+            'stats', AuthorStats,
+            ('author', 'posts_count', 'followers_count', 'following_count'),
+            (
+                (
+                    pk,
+                    self.posts_count[pk],
+                    self.followers[pk],
+                    self.following[pk],
+                )
+                for pk in self.user_ids
+            ),
+        )
+
+    def _timeline_rows(self):
+        """Backfill every follow like ``timeline.backfill()`` would."""
+        pulled = {
+            pk for pk, count in self.followers.items()
+            if count > settings.FANOUT_FOLLOWERS_LIMIT
+        }
+        pairs = Follow.objects.filter(
+            user__gte=self.user_ids[0]
+        ).values_list('user', 'author')
+        for user_id, author_id in pairs.iterator():
+            if author_id not in pulled and author_id in self.recent:
+                for post_id, pub_date in self.recent[author_id]:
+                    yield user_id, post_id, pub_date
+
+    def _seed_timelines(self):
+        self._write(
+            'timelines', TimelineEntry, ('user', 'post', 'pub_date'),
+            self._timeline_rows(),
+        )
+
+    def _reset_sequences(self):
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), [User, Group, Post, Comment]
+        )
+        if statements:
+            with connection.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
@@ -0,0 +1,161 @@
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.db.models.signals import (
+    post_delete, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+
+from . import changes, counters, feed_cache, search, timeline
+from .cards import invalidate_cards
+from .excerpts import summarize
+from .models import AuthorStats, Change, Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+NAME_FIELDS = ('username', 'first_name', 'last_name')
+
+
+def _bump_feeds_showing(*scopes, **lookup):
+    """Bump ``scopes`` and every feed with cards of posts matching
+    ``lookup``, so their ETags change along with the cards."""
+    posts = Post.objects.filter(**lookup).order_by()
+    authors = posts.values_list('author', flat=True).distinct()
+    groups = posts.exclude(group=None).values_list(
+        'group', flat=True
+    ).distinct()
+    feed_cache.bump(
+        'global', *scopes,
+        *(f'author:{pk}' for pk in authors),
+        *(f'group:{pk}' for pk in groups),
+    )
+
+
+@receiver(pre_save, sender=User)
+def user_renaming(sender, instance, raw=False, update_fields=None,
+                  **kwargs):
+    instance._renamed = False
+    if raw or instance._state.adding:
+        return
+    if update_fields is not None and not set(update_fields) & set(
+        NAME_FIELDS
+    ):
+        return
+    previous = User.objects.filter(pk=instance.pk).values_list(
+        *NAME_FIELDS
+    ).first()
+    instance._renamed = previous is not None and previous != tuple(
+        getattr(instance, field) for field in NAME_FIELDS
+    )
+
+
+@receiver(post_save, sender=User)
+def user_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        AuthorStats.objects.get_or_create(author=instance)
+    if getattr(instance, '_renamed', False):
+        invalidate_cards(author=instance)
+        # Post pages also show the names of the commenters.
+        invalidate_cards(comments__author=instance)
+        _bump_feeds_showing(f'author:{instance.pk}', author=instance)
+
+
+@receiver(pre_save, sender=Post)
+def post_summarized(sender, instance, **kwargs):
+    instance.excerpt, instance.word_count = summarize(instance.text)
+
+
+@receiver(pre_save, sender=Post)
+def post_edited(sender, instance, raw=False, **kwargs):
+    if not instance._state.adding and not raw:
+        # Bumped in the UPDATE itself, a concurrent edit or
+        # invalidate_cards() may have moved it since this was loaded.
+        instance.version = F('version') + 1
+        instance._previous_group_id = Post.objects.filter(
+            pk=instance.pk
+        ).values_list('group', flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    search.reindex(instance.pk)
+    if created:
+        changes.log_post(instance, Change.CREATED)
+        counters.bump_author(instance.author_id, 'posts_count', 1)
+        timeline.fan_out(instance)
+        feed_cache.bump(
+            *feed_cache.post_scopes(instance.author_id, instance.group_id)
+        )
+        return
+    if not isinstance(instance.version, int):
+        instance.refresh_from_db(fields=['version'])
+    # Edits change the feeds' ETags, see posts.conditional.
+    scopes = feed_cache.post_scopes(instance.author_id, instance.group_id)
+    previous_group_id = getattr(instance, '_previous_group_id', None)
+    changes.log_post(instance, Change.UPDATED, previous_group_id)
+    if previous_group_id and previous_group_id != instance.group_id:
+        scopes.append(f'group:{previous_group_id}')
+    feed_cache.bump(*scopes)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    changes.log_post(instance, Change.DELETED)
+    search.reindex(instance.pk)
+    counters.bump_author(instance.author_id, 'posts_count', -1)
+    feed_cache.bump(
+        *feed_cache.post_scopes(instance.author_id, instance.group_id)
+    )
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        counters.bump_post(instance.post_id, 1)
+        invalidate_cards(pk=instance.post_id)
+    changes.log_comment(
+        instance, Change.CREATED if created else Change.UPDATED
+    )
+    search.reindex_comments(instance.pk)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    changes.log_comment(instance, Change.DELETED)
+    counters.bump_post(instance.post_id, -1)
+    invalidate_cards(pk=instance.post_id)
+    search.reindex_comments(instance.pk)
+
+
+@receiver(post_save, sender=Group)
+def group_changed(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        invalidate_cards(group=instance)
+        _bump_feeds_showing(f'group:{instance.pk}', group=instance)
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    invalidate_cards(group=instance)
+    _bump_feeds_showing(f'group:{instance.pk}', group=instance)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        changes.log_follow(instance, Change.CREATED)
+        counters.bump_author(instance.author_id, 'followers_count', 1)
+        counters.bump_author(instance.user_id, 'following_count', 1)
+        timeline.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    changes.log_follow(instance, Change.DELETED)
+    counters.bump_author(instance.author_id, 'followers_count', -1)
+    counters.bump_author(instance.user_id, 'following_count', -1)
+    timeline.prune(instance.user_id, instance.author_id)
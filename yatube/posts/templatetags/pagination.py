@@ -0,0 +1,34 @@
+from django import template
+
+register = template.Library()
+
+
+@register.simple_tag
+def page_window(page, on_each_side=2, on_ends=1):
+    """Page numbers around the current one, with None marking a gap.
+
+    Only the window is computed, never the whole ``page_range``; a
+    capped paginator ends with a gap instead of its last page.
+    """
+    if page.number is None:
+        return []
+    paginator = page.paginator
+    num_pages = paginator.num_pages
+    capped = getattr(paginator, 'capped', False)
+    numbers = set(range(
+        max(page.number - on_each_side, 1),
+        min(page.number + on_each_side, num_pages) + 1,
+    ))
+    numbers.update(range(1, min(on_ends, num_pages) + 1))
+    if not capped:
+        numbers.update(range(max(num_pages - on_ends + 1, 1), num_pages + 1))
+    window = []
+    previous = 0
+    for number in sorted(numbers):
+        if number - previous > 1:
+            window.append(None)
+        window.append(number)
+        previous = number
+    if capped:
+        window.append(None)
+    return window
@@ -0,0 +1,34 @@
+import logging
+
+from django import template
+from django.utils.safestring import mark_safe
+from sorl.thumbnail import get_thumbnail
+
+from core.metrics import timed
+
+from ..cards import render_card
+from ..thumbnails import is_pending
+
+logger = logging.getLogger(__name__)
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_card(post):
+    return mark_safe(render_card(post))
+
+
+@register.simple_tag
+def post_thumbnail(image, geometry, **options):
+    """Thumbnail of an image, or the original while it is being generated."""
+    if not image:
+        return None
+    if is_pending(image.name):
+        return image
+    try:
+        with timed('thumbnail'):
+            return get_thumbnail(image, geometry, **options)
+    except Exception:
+        logger.exception('Thumbnail for %s failed', image.name)
+        return None
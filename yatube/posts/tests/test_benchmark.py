@@ -0,0 +1,41 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from .. import benchmark
+from ..seeding import Seeder
+
+
+class BenchmarkTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Seeder(users=5, groups=2, posts=30, follows=2, texts=5).run()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_run_client_measures_every_scenario(self):
+        scenarios = benchmark.scenarios()
+        results = benchmark.run_client(scenarios, iterations=2, warmup=0)
+        self.assertEqual(
+            set(results), {scenario.name for scenario in scenarios}
+        )
+        for row in results.values():
+            self.assertLessEqual(row['p50_ms'], row['p99_ms'])
+            self.assertGreater(row['queries'], 0)
+
+    def test_compare_reports_regressions(self):
+        row = {'p50_ms': 1, 'p95_ms': 2, 'p99_ms': 3, 'queries': 2}
+        baseline = {
+            'client': {'index': row},
+            'concurrent': {'requests_per_s': 100},
+        }
+        self.assertEqual(benchmark.compare(baseline, baseline), [])
+        results = {
+            'client': {'index': {**row, 'queries': 3, 'p95_ms': 10}},
+            'concurrent': {'requests_per_s': 10},
+        }
+        problems = benchmark.compare(results, baseline)
+        self.assertEqual(len(problems), 3)
+        results['iterations'] = 10
+        problems = benchmark.compare(results, baseline)
+        self.assertEqual(len(problems), 2)
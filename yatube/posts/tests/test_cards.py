@@ -0,0 +1,60 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+
+from ..cards import card_key, render_card
+from ..models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class PostCardCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            author=self.author, group=self.group, text='Первый текст'
+        )
+
+    def test_card_is_cached_by_version(self):
+        html = render_card(self.post)
+        self.assertIn('Первый текст', html)
+        self.assertEqual(cache.get(card_key(self.post)), html)
+
+    def test_edit_bumps_version(self):
+        render_card(self.post)
+        self.post.text = 'Второй текст'
+        self.post.save()
+        self.assertEqual(self.post.version, 2)
+        self.assertIn('Второй текст', render_card(self.post))
+
+    def test_edit_of_stale_instance_still_bumps_version(self):
+        stale = Post.objects.get(pk=self.post.pk)
+        Comment.objects.create(
+            post=self.post, author=self.author, text='Комментарий'
+        )
+        render_card(Post.objects.get(pk=self.post.pk))
+        stale.text = 'Второй текст'
+        stale.save()
+        self.assertEqual(stale.version, 3)
+        self.assertIn('Второй текст', render_card(stale))
+
+    def test_comment_bumps_version(self):
+        Comment.objects.create(
+            post=self.post, author=self.author, text='Комментарий'
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.version, 2)
+
+    def test_group_change_bumps_version(self):
+        render_card(self.post)
+        self.group.slug = 'renamed'
+        self.group.save()
+        self.post.refresh_from_db()
+        self.assertIn('/group/renamed/', render_card(self.post))
@@ -0,0 +1,78 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from .. import changes
+from ..models import Change, Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ChangeLogTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+
+    def logged(self):
+        return list(Change.objects.order_by('pk').values_list(
+            'kind', 'action', 'author_id', 'group_id', 'user_id'
+        ))
+
+    def test_rows_carry_what_scopes_filter_on(self):
+        post = Post.objects.create(
+            author=self.author, group=self.group, text='Пост'
+        )
+        Comment.objects.create(post=post, author=self.reader, text='к')
+        Follow.objects.create(user=self.reader, author=self.author)
+        post.delete()
+        author, group, reader = self.author.pk, self.group.pk, self.reader.pk
+        self.assertEqual(self.logged(), [
+            ('post', 'created', author, group, None),
+            ('comment', 'created', author, group, None),
+            ('follow', 'created', author, None, reader),
+            ('comment', 'deleted', author, group, None),
+            ('post', 'deleted', author, group, None),
+        ])
+
+    def test_empty_scopes_return_the_token_back(self):
+        token = changes.encode_token(0)
+        for scope in ('global', self.group.pk):
+            rows, last, more = changes.since(token, scope)
+            self.assertEqual((rows, last, more), ([], 0, False))
+
+    def test_prune_keeps_recent_changes(self):
+        Post.objects.create(author=self.author, text='Старый')
+        Change.objects.update(created=timezone.now() - timedelta(days=40))
+        Post.objects.create(author=self.author, text='Новый')
+        out = StringIO()
+        call_command('prune_change_log', days=30, stdout=out)
+        self.assertEqual(out.getvalue().strip(), 'Deleted 1 changes')
+        self.assertEqual(Change.objects.count(), 1)
+
+    def test_prune_keeps_the_newest_change(self):
+        Post.objects.create(author=self.author, text='Старый')
+        token = changes.encode_token(Change.objects.get().pk - 1)
+        Post.objects.create(author=self.author, text='Ещё один')
+        Change.objects.update(created=timezone.now() - timedelta(days=40))
+        self.assertEqual(changes.prune(30), 1)
+        self.assertEqual(
+            changes.latest_token(),
+            changes.encode_token(Change.objects.get().pk),
+        )
+        with self.assertRaises(changes.ExpiredToken):
+            changes.since(token, 'global')
+
+    def test_bulk_loads_expire_older_tokens(self):
+        Post.objects.create(author=self.author, text='Пост')
+        token = changes.latest_token()
+        changes.log_resync()
+        with self.assertRaises(changes.ExpiredToken):
+            changes.since(token, 'global')
+        rows, last, more = changes.since(changes.latest_token(), 'global')
+        self.assertEqual(rows, [])
@@ -0,0 +1,78 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from sorl.thumbnail import default
+
+from .. import thumbnails
+from ..models import Post
+from .test_thumbnails import SMALL_GIF
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+class AuditIndexesCommandTest(TestCase):
+    def test_feed_queries_use_indexes(self):
+        out = StringIO()
+        call_command('audit_indexes', stdout=out)
+        self.assertNotIn('FAIL', out.getvalue())
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class WarmThumbnailsCommandTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.post = Post.objects.create(
+            author=User.objects.create_user(username='author'),
+            text='Пост с картинкой',
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'),
+        )
+        self.orphan = default.storage.save(
+            'cache/aa/bb/orphan.gif', ContentFile(SMALL_GIF)
+        )
+
+    def run_command(self, *args):
+        out = StringIO()
+        call_command(
+            'warm_thumbnails', '--workers=0', *args, stdout=out
+        )
+        return out.getvalue()
+
+    def test_generates_thumbnails_and_deletes_orphans(self):
+        output = self.run_command()
+        self.assertIn('Processed 1 images', output)
+        self.assertIn('Deleted 1 orphaned thumbnails', output)
+        self.assertFalse(default.storage.exists(self.orphan))
+        self.assertEqual(len(list(thumbnails.stored_thumbnails())), 1)
+
+    def test_thumbnails_of_deleted_posts_are_orphans(self):
+        self.run_command()
+        self.post.delete()
+        output = self.run_command('--dry-run')
+        self.assertIn('Found 1 orphaned thumbnails', output)
+
+    def test_keeps_thumbnails_written_during_the_run(self):
+        fresh = default.storage.save(
+            'cache/cc/dd/fresh.gif', ContentFile(SMALL_GIF)
+        )
+        started = default.storage.get_modified_time(fresh)
+        older = started.timestamp() - 60
+        os.utime(default.storage.path(self.orphan), (older, older))
+        orphans = thumbnails.remove_orphans(
+            {self.post.image.name}, dry_run=True, before=started
+        )
+        self.assertIn(self.orphan, orphans)
+        self.assertNotIn(fresh, orphans)
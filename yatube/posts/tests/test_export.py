@@ -0,0 +1,96 @@
+import json
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.urls import reverse
+
+from ..export import ExportError, stream
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ExportTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Пост {i}'
+            )
+            for i in range(5)
+        ]
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.reader, text='Комментарий'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def records(self, *args, **kwargs):
+        text = ''.join(stream(*args, chunk_size=2, **kwargs))
+        return [json.loads(line) for line in text.splitlines()]
+
+    def test_ndjson_holds_every_kind(self):
+        records = self.records([])
+        self.assertEqual(
+            [record['type'] for record in records],
+            ['groups'] + ['posts'] * 5 + ['comments', 'follows'],
+        )
+        self.assertEqual(records[1]['text'], 'Пост 0')
+
+    def test_after_id_resumes_export(self):
+        records = self.records(['posts'], after_id=self.posts[2].pk)
+        self.assertEqual(
+            [record['id'] for record in records],
+            [post.pk for post in self.posts[3:]],
+        )
+
+    def test_since_skips_older_rows(self):
+        Post.objects.filter(pk=self.posts[0].pk).update(
+            pub_date='2000-01-01T00:00:00Z'
+        )
+        records = self.records(['posts'], since=self.posts[1].pub_date)
+        self.assertEqual(len(records), 4)
+
+    def test_csv_has_header(self):
+        lines = ''.join(stream(['follows'], 'csv')).splitlines()
+        self.assertEqual(lines[0], 'id,user_id,author_id')
+        self.assertEqual(len(lines), 2)
+
+    def test_invalid_arguments_fail_early(self):
+        with self.assertRaises(ExportError):
+            stream(['posts', 'comments'], 'csv')
+        with self.assertRaises(ExportError):
+            stream(['users'])
+
+    def test_endpoint_is_staff_only(self):
+        self.client.force_login(self.reader)
+        response = self.client.get(reverse('posts:export'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_endpoint_streams_export(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(
+            reverse('posts:export'), {'kind': 'comments', 'format': 'csv'}
+        )
+        self.assertTrue(response.streaming)
+        content = b''.join(response.streaming_content).decode()
+        self.assertIn('Комментарий', content)
+        response = self.client.get(
+            reverse('posts:export'), {'since': 'вчера'}
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_command_writes_ndjson(self):
+        out = StringIO()
+        call_command('export_content', '--kind=groups', stdout=out)
+        self.assertEqual(json.loads(out.getvalue())['slug'], 'group')
+        with self.assertRaises(CommandError):
+            call_command('export_content', '--after-id=1', stdout=out)
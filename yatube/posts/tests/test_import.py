@@ -0,0 +1,124 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from ..export import stream
+from ..models import AuthorStats, Change, Comment, Follow, Group, Post
+from ..search import find_posts
+from .test_thumbnails import SMALL_GIF
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImportCommandTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.source = tempfile.mkdtemp()
+        os.makedirs(os.path.join(cls.source, 'legacy'))
+        with open(os.path.join(cls.source, 'legacy', 'cat.gif'), 'wb') as f:
+            f.write(SMALL_GIF)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(cls.source, ignore_errors=True)
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+
+    def run_import(self, lines, *args):
+        path = os.path.join(self.source, 'import.ndjson')
+        with open(path, 'w', encoding='utf-8') as dump:
+            dump.write(''.join(
+                line if isinstance(line, str) else json.dumps(line) + '\n'
+                for line in lines
+            ))
+        out, err = StringIO(), StringIO()
+        call_command(
+            'import_content', path, '--batch-size=2', *args,
+            stdout=out, stderr=err,
+        )
+        return out.getvalue(), err.getvalue()
+
+    def test_export_round_trip(self):
+        group = Group.objects.create(title='Группа', slug='group')
+        post = Post.objects.create(
+            author=self.author, group=group, text='Старый пост'
+        )
+        Post.objects.filter(pk=post.pk).update(
+            pub_date='2010-05-01T12:00:00Z'
+        )
+        Comment.objects.create(post=post, author=self.reader, text='Ответ')
+        Follow.objects.create(user=self.reader, author=self.author)
+        dump = list(stream([]))
+        Post.objects.all().delete()
+        Group.objects.all().delete()
+        Follow.objects.all().delete()
+
+        out, err = self.run_import(dump)
+
+        self.assertEqual(err, '')
+        self.assertIn('posts: 1 imported', out)
+        imported = Post.objects.get()
+        self.assertEqual(imported.pk, post.pk)
+        self.assertEqual(imported.pub_date.year, 2010)
+        self.assertEqual(imported.comments_count, 1)
+        self.assertEqual(imported.group.slug, 'group')
+        stats = AuthorStats.objects.get(author=self.author)
+        self.assertEqual(stats.followers_count, 1)
+        self.assertEqual(list(find_posts('старый')), [imported])
+        self.assertTrue(self.reader.timeline.filter(post=imported).exists())
+        self.assertEqual(Change.objects.latest('pk').kind, Change.RESYNC)
+
+        out, _ = self.run_import(dump)
+        self.assertIn('posts: 0 imported, 1 already present', out)
+
+    def test_images_outside_the_source_are_refused(self):
+        post = {
+            'type': 'posts', 'id': 60, 'author_id': self.author.pk,
+            'pub_date': '2015-01-01T00:00:00Z', 'text': 'С картинкой',
+            'image': '../import.ndjson',
+        }
+        outside = os.path.join(self.source, 'import.ndjson')
+        lines = [post, dict(post, id=61, image=outside)]
+        legacy = os.path.join(self.source, 'legacy')
+        out, err = self.run_import(lines, f'--images-from={legacy}')
+        self.assertIn('posts: 2 imported', out)
+        self.assertEqual(len(err.splitlines()), 2)
+        self.assertEqual(
+            set(Post.objects.values_list('image', flat=True)), {''}
+        )
+
+    def test_images_are_copied_and_bad_rows_reported(self):
+        post = {
+            'type': 'posts', 'id': 50, 'author_id': self.author.pk,
+            'pub_date': '2015-01-01T00:00:00Z', 'text': 'С картинкой',
+            'image': 'legacy/cat.gif',
+        }
+        lines = [
+            post,
+            dict(post, id=51, image='legacy/missing.gif'),
+            dict(post, id=52, author_id=999),
+            dict(post, id=53, text=''),
+            'not json\n',
+        ]
+        out, err = self.run_import(lines, f'--images-from={self.source}')
+        self.assertIn('posts: 2 imported', out)
+        self.assertEqual(len(err.splitlines()), 4)
+        image = Post.objects.get(pk=50).image
+        self.assertEqual(image.name, 'posts/cat.gif')
+        self.assertTrue(os.path.exists(image.path))
+        self.assertEqual(Post.objects.get(pk=51).image.name, '')
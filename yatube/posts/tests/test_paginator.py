@@ -1,8 +1,14 @@
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from django.utils import timezone
 
 from ..models import Post, Group
+from ..paginators import (
+    NEXT, ApproximateCountPaginator, CursorPaginator, encode_cursor
+)
+from ..templatetags.pagination import page_window
 
 
 User = get_user_model()
@@ -32,6 +38,9 @@ class PaginatorViewsTest(TestCase):
         cls.authorized_client = Client()
         cls.authorized_client.force_login(cls.author)
 
+    def setUp(self):
+        cache.clear()
+
     def test_first_page_index_contains_ten_records(self):
         response = self.client.get(reverse('posts:index'))
         self.assertEqual(len(response.context['page_obj']), 10)
@@ -74,3 +83,151 @@ class PaginatorViewsTest(TestCase):
             ) + '?page=2'
         )
         self.assertEqual(len(response.context['page_obj']), 3)
+
+    def test_next_cursor_continues_after_first_page(self):
+        response = self.client.get(reverse('posts:index'))
+        next_cursor = response.context['page_obj'].next_cursor
+        first_page = list(response.context['page_obj'])
+        response = self.client.get(
+            reverse('posts:index') + f'?cursor={next_cursor}'
+        )
+        page_obj = response.context['page_obj']
+        self.assertTrue(page_obj.is_cursor)
+        self.assertEqual(len(page_obj), 3)
+        self.assertIsNone(page_obj.next_cursor)
+        self.assertFalse(set(first_page) & set(page_obj))
+
+    def test_previous_cursor_returns_to_first_page(self):
+        response = self.client.get(reverse('posts:index') + '?page=2')
+        previous_cursor = response.context['page_obj'].previous_cursor
+        response = self.client.get(
+            reverse('posts:index') + f'?cursor={previous_cursor}'
+        )
+        self.assertEqual(response.context['page_obj'].number, 1)
+        self.assertEqual(len(response.context['page_obj']), 10)
+
+    def test_cursor_breaks_pub_date_ties_by_pk(self):
+        Post.objects.update(pub_date=timezone.now())
+        seen = []
+        response = self.client.get(reverse('posts:profile', kwargs={
+            'username': 'author'
+        }))
+        while True:
+            page_obj = response.context['page_obj']
+            seen.extend(post.pk for post in page_obj)
+            if not page_obj.next_cursor:
+                break
+            response = self.client.get(
+                reverse('posts:profile', kwargs={'username': 'author'})
+                + f'?cursor={page_obj.next_cursor}'
+            )
+        self.assertEqual(len(seen), 13)
+        self.assertEqual(len(set(seen)), 13)
+
+    def test_invalid_cursor_falls_back_to_first_page(self):
+        response = self.client.get(reverse('posts:index') + '?cursor=junk')
+        self.assertEqual(response.context['page_obj'].number, 1)
+
+    def test_cursor_of_another_key_type_falls_back_to_first_page(self):
+        number = encode_cursor(NEXT, 1.5, 3)
+        for url in (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'test-slug'}),
+        ):
+            response = self.client.get(url, {'cursor': number})
+            self.assertEqual(response.context['page_obj'].number, 1)
+        response = self.client.get(
+            reverse('posts:search'),
+            {'q': 'Пост', 'cursor': encode_cursor(NEXT, timezone.now(), 3)},
+        )
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(
+            reverse('posts:post_comments', args=[Post.objects.first().pk]),
+            {'cursor': number},
+        )
+        self.assertEqual(response.status_code, 200)
+
+
+class PageWindowTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(username='author')
+        Post.objects.bulk_create(
+            Post(author=author, text=f'Пост {i}') for i in range(100)
+        )
+
+    def window(self, number, **kwargs):
+        paginator = CursorPaginator(Post.objects.all(), 2, **kwargs)
+        return page_window(paginator.get_page(number))
+
+    def test_window_is_elided(self):
+        self.assertEqual(
+            self.window(25), [1, None, 23, 24, 25, 26, 27, None, 50]
+        )
+        self.assertEqual(self.window(1), [1, 2, 3, None, 50])
+        self.assertEqual(self.window(50), [1, None, 48, 49, 50])
+
+    def test_capped_count_hides_last_page(self):
+        paginator = CursorPaginator(Post.objects.all(), 2, count_limit=20)
+        self.assertEqual(paginator.count, 20)
+        self.assertTrue(paginator.capped)
+        last = paginator.get_page(10)
+        self.assertIsNotNone(last.next_cursor)
+        self.assertEqual(page_window(last), [1, None, 8, 9, 10, None])
+
+    def test_small_table_is_not_capped(self):
+        paginator = CursorPaginator(Post.objects.all(), 2, count_limit=500)
+        self.assertEqual(paginator.count, 100)
+        self.assertFalse(paginator.capped)
+
+
+@override_settings(APPROXIMATE_COUNT_THRESHOLD=50)
+class ApproximateCountTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        Post.objects.bulk_create(
+            Post(author=cls.author, text=f'Пост {i}') for i in range(60)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def paginator(self, queryset):
+        return ApproximateCountPaginator(queryset, 10, 'test')
+
+    def test_small_feed_is_counted_exactly(self):
+        paginator = self.paginator(Post.objects.filter(text='Пост 1'))
+        self.assertEqual(paginator.count, 1)
+        self.assertFalse(paginator.approximate)
+
+    def test_large_feed_count_is_cached(self):
+        self.assertEqual(self.paginator(Post.objects.all()).count, 60)
+        Post.objects.create(author=self.author, text='Новый пост')
+        with self.assertNumQueries(0):
+            paginator = self.paginator(Post.objects.all())
+            self.assertEqual(paginator.count, 60)
+        self.assertTrue(paginator.approximate)
+        self.assertFalse(paginator.capped)
+
+    def test_large_feed_is_counted_once(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.paginator(Post.objects.all()).count, 60)
+
+    def test_cached_count_replaces_count(self):
+        cache.set('feed_count:test', 55)
+        paginator = self.paginator(Post.objects.all())
+        self.assertEqual(paginator.num_pages, 6)
+        last = paginator.get_page(6)
+        self.assertEqual(len(last), 5)
+        self.assertIsNotNone(last.next_cursor)
+
+    def test_count_is_capped_by_count_limit(self):
+        paginator = ApproximateCountPaginator(
+            Post.objects.all(), 10, 'test', count_limit=30
+        )
+        self.assertEqual(paginator.count, 30)
+        self.assertTrue(paginator.capped)
+        deep = paginator.get_page(999999)
+        self.assertEqual(deep.number, 3)
+        self.assertIsNotNone(deep.next_cursor)
@@ -0,0 +1,97 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Comment, Post
+from ..search import find_posts, rebuild, to_query
+
+User = get_user_model()
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        cls.once = Post.objects.create(
+            author=cls.author, text='Кошка спит на диване'
+        )
+        cls.twice = Post.objects.create(
+            author=cls.author, text='Кошка и ещё одна кошка'
+        )
+        cls.other = Post.objects.create(
+            author=cls.author, text='Собака лает'
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_results_are_ranked(self):
+        self.assertEqual(list(find_posts('кошка')), [self.twice, self.once])
+
+    def test_last_word_is_a_prefix(self):
+        self.assertEqual(list(find_posts('соба')), [self.other])
+
+    def test_operators_are_searched_literally(self):
+        self.assertEqual(to_query('a "b'), '"a" """b"*')
+        self.assertEqual(list(find_posts('AND OR "')), [])
+
+    def test_index_follows_edits_comments_and_deletes(self):
+        post = Post.objects.create(author=self.author, text='Рыбка')
+        post.text = 'Попугай говорит'
+        post.save()
+        self.assertEqual(list(find_posts('рыбка')), [])
+        comment = Comment.objects.create(
+            post=self.once, author=self.author, text='Попугай рядом'
+        )
+        self.assertEqual(list(find_posts('попугай')), [post, self.once])
+        comment.delete()
+        post.delete()
+        self.assertEqual(list(find_posts('попугай')), [])
+
+    def test_each_comment_is_indexed_on_its_own(self):
+        for text in ('Попугай рядом', 'И здесь попугай'):
+            Comment.objects.create(
+                post=self.other, author=self.author, text=text
+            )
+        self.assertEqual(list(find_posts('попугай')), [self.other])
+        self.assertEqual(list(find_posts('попугай здесь')), [self.other])
+        self.assertEqual(list(find_posts('попугай лает')), [])
+
+    def test_rebuild_indexes_bulk_created_posts(self):
+        Post.objects.bulk_create([Post(author=self.author, text='Ёжик')])
+        Comment.objects.create(post=self.once, author=self.author, text='к')
+        self.assertEqual(list(find_posts('ёжик')), [])
+        self.assertEqual(rebuild(), (4, 1))
+        self.assertEqual(len(find_posts('ёжик')), 1)
+
+    def test_search_view_pages_by_cursor(self):
+        Post.objects.bulk_create(
+            Post(author=self.author, text=f'Кошка номер {i}')
+            for i in range(12)
+        )
+        rebuild()
+        url = reverse('posts:search')
+        response = self.client.get(url, {'q': 'кошка'})
+        page_obj = response.context['page_obj']
+        self.assertEqual(len(page_obj), 10)
+        self.assertContains(response, 'q=%D0%BA%D0%BE%D1%88%D0%BA%D0%B0')
+        response = self.client.get(
+            url, {'q': 'кошка', 'cursor': page_obj.next_cursor}
+        )
+        self.assertEqual(len(response.context['page_obj']), 4)
+        self.assertFalse(
+            set(page_obj) & set(response.context['page_obj'])
+        )
+
+    def test_admin_search_uses_index(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'диван'}
+        )
+        self.assertEqual(
+            list(response.context['cl'].result_list), [self.once]
+        )
@@ -0,0 +1,90 @@
+from datetime import datetime
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import transaction
+from django.db.models import F
+from django.test import TestCase
+from django.utils import timezone
+
+from .. import counters
+from ..models import AuthorStats, Comment, Follow, Post, TimelineEntry
+from ..seeding import Seeder
+
+UNTIL = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def snapshot():
+    return (
+        list(Post.objects.order_by('pk').values_list(
+            'author__username', 'group__slug', 'text', 'pub_date',
+            'comments_count',
+        )),
+        list(Comment.objects.order_by('pk').values_list(
+            'post__pub_date', 'author__username', 'text', 'pub_date'
+        )),
+        sorted(Follow.objects.values_list(
+            'user__username', 'author__username'
+        )),
+    )
+
+
+class SeederTest(TestCase):
+    def seed(self, **options):
+        options = {
+            'users': 30, 'groups': 3, 'posts': 300, 'follows': 4,
+            'until': UNTIL, 'texts': 20, **options,
+        }
+        return Seeder(**options).run()
+
+    def test_creates_requested_content(self):
+        created = self.seed()
+        self.assertEqual(created['users'], 30)
+        self.assertEqual(Post.objects.count(), 300)
+        self.assertEqual(Comment.objects.count(), created['comments'])
+        self.assertTrue(Follow.objects.exists())
+        self.assertFalse(Follow.objects.filter(
+            user=F('author')
+        ).exists())
+        newest = Post.objects.first()
+        self.assertLessEqual(newest.pub_date, UNTIL)
+        self.assertFalse(Comment.objects.filter(
+            pub_date__lt=F('post__pub_date')
+        ).exists())
+
+    def test_counters_need_no_reconciling(self):
+        self.seed()
+        self.assertEqual(counters.reconcile(), (0, 0))
+
+    def test_timelines_hold_followed_posts_only(self):
+        self.seed(timeline_depth=3)
+        entry = TimelineEntry.objects.select_related('post').first()
+        self.assertTrue(Follow.objects.filter(
+            user=entry.user_id, author=entry.post.author_id
+        ).exists())
+        per_pair = TimelineEntry.objects.filter(
+            user=entry.user_id, post__author=entry.post.author_id
+        ).count()
+        self.assertLessEqual(per_pair, 3)
+
+    def test_same_seed_gives_same_content(self):
+        with transaction.atomic():
+            self.seed(seed=7)
+            first = snapshot()
+            transaction.set_rollback(True)
+        self.seed(seed=7)
+        self.assertEqual(snapshot(), first)
+
+    def test_activity_is_skewed(self):
+        self.seed(author_skew=1.5)
+        busiest = AuthorStats.objects.order_by('-posts_count').first()
+        self.assertGreater(busiest.posts_count, 3 * 300 / 30)
+
+    def test_command_reports_each_table(self):
+        out = StringIO()
+        call_command(
+            'seed', users=10, groups=2, posts=50, until=UNTIL.isoformat(),
+            no_search_index=True, stdout=out,
+        )
+        self.assertIn('posts: 50 rows', out.getvalue())
+        self.assertEqual(Post.objects.count(), 50)
@@ -0,0 +1,98 @@
+import os
+import shutil
+import tempfile
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+
+from .. import thumbnails
+from ..cards import card_key, render_card
+from ..models import Post
+from ..templatetags.post_cards import post_thumbnail
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class ThumbnailTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        shutil.rmtree(self.thumbnail_dir(), ignore_errors=True)
+        self.post = Post.objects.create(
+            author=User.objects.create_user(username='author'),
+            text='Пост с картинкой',
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'),
+        )
+
+    def thumbnail_dir(self):
+        return os.path.join(TEMP_MEDIA_ROOT, 'cache')
+
+    def test_enqueue_renders_configured_thumbnails(self):
+        thumbnails.enqueue(self.post)
+        self.assertTrue(os.path.isdir(self.thumbnail_dir()))
+
+    def test_pending_image_falls_back_to_original(self):
+        cache.set(thumbnails.PENDING_KEY.format(self.post.image.name), 1)
+        image = post_thumbnail(self.post.image, '960x339')
+        self.assertEqual(image.url, self.post.image.url)
+        self.assertFalse(os.path.isdir(self.thumbnail_dir()))
+
+    def test_post_without_image_is_skipped(self):
+        post = Post.objects.create(author=self.post.author, text='Без')
+        thumbnails.enqueue(post)
+        self.assertIsNone(post_thumbnail(post.image, '960x339'))
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=1)
+class ThumbnailPoolTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            author=User.objects.create_user(username='author'),
+            text='Пост с картинкой',
+            image=SimpleUploadedFile('pool.gif', SMALL_GIF, 'image/gif'),
+        )
+
+    def tearDown(self):
+        thumbnails._reset_executor(wait=True)
+
+    def test_pool_job_clears_pending_and_card_refreshes(self):
+        name = self.post.image.name
+        future = thumbnails.enqueue(self.post)
+        self.assertTrue(thumbnails.is_pending(name))
+        self.assertIn(self.post.image.url, render_card(self.post))
+        self.assertIsNone(cache.get(card_key(self.post)))
+        future.result(timeout=60)
+        deadline = time.monotonic() + 10
+        while thumbnails.is_pending(name) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertFalse(thumbnails.is_pending(name))
+        card = render_card(self.post)
+        self.assertNotIn(self.post.image.url, card)
+        self.assertIn('/cache/', card)
+        self.assertEqual(cache.get(card_key(self.post)), card)
@@ -6,11 +6,13 @@ from django.contrib.auth import get_user_model
 
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.cache import cache
+from django.db import connection
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django import forms
 
-from ..models import Post, Group, Comment
+from ..models import Comment, Follow, Group, Post
 
 
 User = get_user_model()
@@ -252,17 +254,221 @@ class PostViewsTest(TestCase):
         self.assertEqual(first_comment_author, 'author')
 
     def test_cache_index(self):
-        before_create_post = self.authorized_client.get(
-            reverse('posts:index'))
-        first_item_before = before_create_post.content
+        self.authorized_client.get(reverse('posts:index'))
+        with CaptureQueriesContext(connection) as queries:
+            self.authorized_client.get(reverse('posts:index'))
+        self.assertFalse(any(
+            'COUNT' in query['sql'] for query in queries.captured_queries
+        ))
         Post.objects.create(
             author=self.author,
             text='Проверка кэша',
             group=self.group
         )
         after_create_post = self.authorized_client.get(reverse('posts:index'))
-        first_item_after = after_create_post.content
-        self.assertEqual(first_item_after, first_item_before)
+        self.assertContains(after_create_post, 'Проверка кэша')
+
+    def test_only_writes_take_the_write_lock(self):
+        # Inside the test transaction atomic() opens a savepoint where
+        # it would otherwise BEGIN IMMEDIATE.
+        for url in (
+            reverse('posts:post_create'),
+            reverse('posts:add_comment', kwargs={'post_id': self.post.pk}),
+        ):
+            with CaptureQueriesContext(connection) as queries:
+                self.authorized_client.get(url)
+            self.assertFalse(any(
+                'SAVEPOINT' in query['sql']
+                for query in queries.captured_queries
+            ), url)
+
+    def test_cache_sees_edits_and_deletes(self):
+        post = Post.objects.create(
+            author=self.author,
+            text='До правки',
+            group=self.group
+        )
+        url = reverse('posts:group_list', kwargs={'slug': 'test-slug'})
+        self.authorized_client.get(url)
+        post.text = 'После правки'
+        post.save()
+        self.assertContains(self.authorized_client.get(url), 'После правки')
+        post.delete()
+        self.assertNotContains(
+            self.authorized_client.get(url), 'После правки'
+        )
+
+
+@override_settings(COMMENTS_PAGE=2)
+class CommentChunksTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=author, text='Пост')
+        # Same pub_date everywhere, so the pk has to break the ties.
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=author, text=f'комментарий {i}')
+            for i in range(5)
+        )
+        Comment.objects.update(pub_date=cls.post.pub_date)
+
+    def test_post_detail_shows_first_chunk(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse('posts:post_detail', args=[self.post.pk])
+            )
+        self.assertEqual(
+            [c.text for c in response.context['comments']],
+            ['комментарий 4', 'комментарий 3'],
+        )
+        self.assertIsNotNone(response.context['next_cursor'])
+        self.assertFalse(any(
+            'COUNT' in query['sql'] for query in queries.captured_queries
+        ))
+
+    def test_chunks_continue_to_the_last_comment(self):
+        url = reverse('posts:post_comments', args=[self.post.pk])
+        cursor = self.client.get(
+            reverse('posts:post_detail', args=[self.post.pk])
+        ).context['next_cursor']
+        texts = []
+        while cursor:
+            response = self.client.get(url, {'cursor': cursor})
+            texts += [c.text for c in response.context['comments']]
+            cursor = response.context['next_cursor']
+        self.assertEqual(
+            texts, ['комментарий 2', 'комментарий 1', 'комментарий 0']
+        )
+        self.assertNotContains(response, 'data-comments-more')
+
+    def test_unknown_post_is_404(self):
+        response = self.client.get(
+            reverse('posts:post_comments', args=[self.post.pk + 1])
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(EXCERPT_WORDS=3)
+class FeedExcerptTest(TestCase):
+    def setUp(self):
         cache.clear()
-        after_clear = self.authorized_client.get(reverse('posts:index'))
-        self.assertNotEqual(first_item_after, after_clear)
+        self.author = User.objects.create_user(username='author')
+
+    def test_excerpt_follows_text(self):
+        post = Post.objects.create(author=self.author, text='раз два')
+        self.assertEqual((post.excerpt, post.word_count), ('раз два', 2))
+        post.text = 'раз два три четыре пять'
+        post.save()
+        post.refresh_from_db()
+        self.assertEqual(post.excerpt, 'раз два три…')
+        self.assertEqual(post.word_count, 5)
+        self.assertTrue(post.is_excerpt_cut)
+
+    def test_feed_reads_excerpt_instead_of_text(self):
+        Post.objects.create(
+            author=self.author, text='раз два три четыре конец'
+        )
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'раз два три…')
+        self.assertContains(response, 'читать полностью')
+        self.assertNotContains(response, 'конец')
+        self.assertFalse(any(
+            '"posts_post"."text"' in query['sql']
+            for query in queries.captured_queries
+        ))
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Пост'
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def revalidate(self, url):
+        tag = self.client.get(url)['ETag']
+        return self.client.get(url, HTTP_IF_NONE_MATCH=tag).status_code
+
+    def test_unchanged_pages_are_not_modified(self):
+        for url in (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=['group']),
+            reverse('posts:profile', args=['author']),
+            reverse('posts:post_detail', args=[self.post.pk]),
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(self.revalidate(url), 304)
+
+    def test_not_modified_keeps_the_tag(self):
+        url = reverse('posts:index')
+        tag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=tag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], tag)
+
+    def test_renamed_commenter_changes_the_post_tag(self):
+        reader = User.objects.create_user(username='reader')
+        Comment.objects.create(post=self.post, author=reader, text='к')
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        tag = self.client.get(url)['ETag']
+        reader.username = 'renamed_reader'
+        reader.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=tag)
+        self.assertContains(response, 'renamed_reader')
+
+    def test_edits_and_comments_change_the_tag(self):
+        urls = [
+            reverse('posts:group_list', args=['group']),
+            reverse('posts:post_detail', args=[self.post.pk]),
+        ]
+        tags = [self.client.get(url)['ETag'] for url in urls]
+        self.post.text = 'Исправленный пост'
+        self.post.save()
+        for url, tag in zip(urls, tags):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=tag)
+            self.assertEqual(response.status_code, 200)
+        tag = self.client.get(urls[1])['ETag']
+        Comment.objects.create(post=self.post, author=self.author, text='к')
+        response = self.client.get(urls[1], HTTP_IF_NONE_MATCH=tag)
+        self.assertContains(response, 'к')
+
+    def test_renames_change_the_tags_of_feeds_showing_them(self):
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:profile', args=['author']),
+            reverse('posts:group_list', args=['group']),
+        ]
+        for rename in (self.rename_group, self.rename_author):
+            tags = [self.client.get(url)['ETag'] for url in urls]
+            rename()
+            for url, tag in zip(urls, tags):
+                with self.subTest(rename=rename.__name__, url=url):
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=tag)
+                    self.assertEqual(response.status_code, 200)
+
+    def rename_group(self):
+        self.group.title = 'Переименованная группа'
+        self.group.save()
+
+    def rename_author(self):
+        self.author.first_name = 'Новое'
+        self.author.save()
+
+    def test_viewers_get_their_own_tags(self):
+        url = reverse('posts:profile', args=['author'])
+        tag = self.client.get(url)['ETag']
+        reader = User.objects.create_user(username='reader')
+        self.client.force_login(reader)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=tag)
+        self.assertEqual(response.status_code, 200)
+        Follow.objects.create(user=reader, author=self.author)
+        response = self.client.get(
+            url, HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,219 @@
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.kvstores.base import KVStoreBase
+
+from core.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+PENDING_KEY = 'thumbnail_pending:{}'
+PENDING_TIMEOUT = 300
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class MemoryKVStore(KVStoreBase):
+    """Throwaway store for pool workers: they only write thumbnail files,
+    the web process records them in the real store on first render."""
+
+    def __init__(self):
+        super().__init__()
+        self.data = {}
+
+    def _get_raw(self, key):
+        return self.data.get(key)
+
+    def _set_raw(self, key, value):
+        self.data[key] = value
+
+    def _delete_raw(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    def _find_keys_raw(self, prefix):
+        return [key for key in self.data if key.startswith(prefix)]
+
+
+def _init_worker():
+    import django
+    django.setup()
+    default.kvstore._wrapped = MemoryKVStore()
+
+
+def render(source):
+    """Generate the POST_THUMBNAILS of an image name or ImageFile."""
+    with timed('thumbnail'):
+        for geometry, options in settings.POST_THUMBNAILS:
+            get_thumbnail(source, geometry, **options)
+
+
+def _render_in_worker(media_root, media_url, name):
+    # The pool outlives changes of MEDIA_ROOT in the parent, so every
+    # job brings the storage location it has to read and write.
+    storage = FileSystemStorage(location=media_root, base_url=media_url)
+    default.storage._wrapped = storage
+    render(ImageFile(name, storage))
+    default.kvstore.data.clear()
+
+
+def _job(name):
+    return (_render_in_worker, settings.MEDIA_ROOT, settings.MEDIA_URL, name)
+
+
+def _pool(workers):
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_worker,
+    )
+
+
+def _executor_instance():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = _pool(settings.THUMBNAIL_WORKERS)
+    return _executor
+
+
+def _reset_executor(wait=False):
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=wait)
+        _executor = None
+
+
+def _render_inline(name):
+    try:
+        render(name)
+    except Exception:
+        logger.exception('Thumbnail generation failed for %s', name)
+
+
+def is_pending(name):
+    return cache.get(PENDING_KEY.format(name)) is not None
+
+
+def _finished(name, future):
+    # Runs in an executor thread: no database writes here. Cards are not
+    # cached while their thumbnail is pending, so the next render after
+    # this picks the thumbnail up.
+    error = future.exception()
+    if isinstance(error, BrokenProcessPool):
+        _reset_executor()
+    if error is not None:
+        logger.error('Thumbnail generation failed for %s: %s', name, error)
+    cache.delete(PENDING_KEY.format(name))
+
+
+def enqueue(post):
+    """Generate the post's thumbnails in the worker pool.
+
+    Until the job finishes templates show the original image instead of
+    rendering the thumbnail inside the request. Call it once the post is
+    committed. Returns the job's future, None when nothing was queued.
+    """
+    if not post.image:
+        return None
+    name = post.image.name
+    if not settings.THUMBNAIL_WORKERS:
+        _render_inline(name)
+        return None
+    cache.set(PENDING_KEY.format(name), post.pk, PENDING_TIMEOUT)
+    try:
+        future = _executor_instance().submit(*_job(name))
+    except (BrokenProcessPool, RuntimeError):
+        logger.exception('Thumbnail pool unavailable, rendering %s inline',
+                         name)
+        _reset_executor()
+        cache.delete(PENDING_KEY.format(name))
+        _render_inline(name)
+        return None
+    future.add_done_callback(lambda done: _finished(name, done))
+    return future
+
+
+def warm(names, workers):
+    """Generate missing thumbnails of ``names`` with ``workers`` processes.
+
+    Yields ``(name, error)`` as each image is done. Files are written by
+    the pool, this process only records them in the key-value store.
+    """
+    if not workers:
+        for name in names:
+            try:
+                render(name)
+            except Exception as error:
+                yield name, error
+            else:
+                yield name, None
+        return
+    with _pool(workers) as pool:
+        jobs = {pool.submit(*_job(name)): name for name in names}
+        for future in as_completed(jobs):
+            name = jobs[future]
+            error = future.exception()
+            if error is None:
+                try:
+                    render(name)
+                except Exception as exc:
+                    error = exc
+            yield name, error
+
+
+def known_thumbnails(names):
+    """Storage names of every thumbnail recorded for the given images."""
+    kvstore = default.kvstore
+    known = set()
+    for name in names:
+        source = ImageFile(name, default.storage)
+        for key in kvstore._get(source.key, identity='thumbnails') or []:
+            thumbnail = kvstore._get(key)
+            if thumbnail is not None:
+                known.add(thumbnail.name)
+    return known
+
+
+def stored_thumbnails(path=None):
+    """Walk the thumbnail directory of the storage."""
+    storage = default.storage
+    path = path or sorl_settings.THUMBNAIL_PREFIX.rstrip('/')
+    if not storage.exists(path):
+        return
+    directories, files = storage.listdir(path)
+    for directory in directories:
+        yield from stored_thumbnails(f'{path}/{directory}')
+    for name in files:
+        yield f'{path}/{name}'
+
+
+def remove_orphans(names, dry_run=False, before=None):
+    """Delete thumbnail files that no image in ``names`` refers to.
+
+    Files modified at or after ``before`` are kept: they may belong to an
+    image uploaded while the caller was busy and not yet in ``names``.
+    Returns the deleted storage names.
+    """
+    storage = default.storage
+    known = known_thumbnails(names)
+    orphans = [
+        name for name in stored_thumbnails() if name not in known
+        and (before is None or storage.get_modified_time(name) < before)
+    ]
+    if not dry_run:
+        for name in orphans:
+            storage.delete(name)
+        default.kvstore.cleanup()
+    return orphans
@@ -0,0 +1,79 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F, Q
+
+from .models import AuthorStats, Follow, Post, TimelineEntry
+
+PULL_AUTHORS_KEY = 'timeline:pull_authors'
+PULL_AUTHORS_TIMEOUT = 600
+FEED_KEYS = ('feed_date', 'feed_pk')
+
+
+def pull_authors():
+    """Ids of authors too popular to fan out; their posts are read live."""
+    authors = cache.get(PULL_AUTHORS_KEY)
+    if authors is None:
+        authors = set(AuthorStats.objects.filter(
+            followers_count__gt=settings.FANOUT_FOLLOWERS_LIMIT
+        ).values_list('author', flat=True))
+        cache.set(PULL_AUTHORS_KEY, authors, PULL_AUTHORS_TIMEOUT)
+    return authors
+
+
+def fan_out(post):
+    if post.author_id in pull_authors():
+        return
+    followers = Follow.objects.filter(
+        author=post.author_id
+    ).values_list('user', flat=True)
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+            for user_id in followers.iterator()
+        ),
+        batch_size=settings.FANOUT_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def backfill(user_id, author_id):
+    if author_id in pull_authors():
+        return
+    posts = Post.objects.filter(author=author_id).values_list(
+        'pk', 'pub_date'
+    )[:settings.TIMELINE_BACKFILL]
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+            for pk, pub_date in posts
+        ),
+        batch_size=settings.FANOUT_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def prune(user_id, author_id):
+    TimelineEntry.objects.filter(
+        user=user_id, post__author=author_id
+    ).delete()
+
+
+def followed_posts(user):
+    """Follow feed ordered by FEED_KEYS.
+
+    Fanned-out posts are ordered by the timeline row itself so the feed
+    is a range read over the (user, pub_date, post) index.
+    """
+    pulled = pull_authors() & set(
+        Follow.objects.filter(user=user).values_list('author', flat=True)
+    )
+    if not pulled:
+        return Post.objects.feed().filter(
+            timeline_entries__user=user
+        ).annotate(
+            feed_date=F('timeline_entries__pub_date'),
+            feed_pk=F('timeline_entries__post'),
+        )
+    return Post.objects.feed().filter(
+        Q(timeline_entries__user=user) | Q(author__in=pulled)
+    ).distinct().annotate(feed_date=F('pub_date'), feed_pk=F('pk'))
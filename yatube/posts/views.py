@@ -1,75 +1,147 @@
 from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.db import transaction
+from django.http import HttpResponseBadRequest, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
+from django.utils.http import urlencode
 
+from . import export, thumbnails
+from .conditional import not_modified, page_etag
+from .counters import stats_for
+from .feed_cache import cached_paginate, generation
 from .forms import PostForm, CommentForm
 from .models import Group, Post, User, Follow
+from .paginators import CursorPaginator, paginate
+from .search import SEARCH_KEYS, find_posts
+from .timeline import FEED_KEYS, followed_posts
 
 
-@cache_page(20, key_prefix=settings.PAGE)
 def index(request):
+    tag = page_etag(request, generation('global'))
+    response = not_modified(request, tag)
+    if response:
+        return response
     title = 'Последние обновления на сайте'
     template = 'posts/index.html'
-    posts = Post.objects.all()
-    paginator = Paginator(posts, settings.PAGE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    posts = Post.objects.feed()
+    page_obj = cached_paginate(request, posts, 'global')
     context = {
         'page_obj': page_obj,
         'title': title,
     }
-    return render(request, template, context)
+    response = render(request, template, context)
+    response['ETag'] = tag
+    return response
 
 
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
+    tag = page_etag(request, generation(f'group:{group.pk}'))
+    response = not_modified(request, tag)
+    if response:
+        return response
     template = 'posts/group_list.html'
-    posts = Post.objects.filter(group=group)
-    paginator = Paginator(posts, settings.PAGE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    posts = Post.objects.feed().filter(group=group)
+    page_obj = cached_paginate(request, posts, f'group:{group.pk}')
     context = {
         'group': group,
         'page_obj': page_obj,
     }
-    return render(request, template, context)
+    response = render(request, template, context)
+    response['ETag'] = tag
+    return response
 
 
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
     template = 'posts/profile.html'
-    posts = Post.objects.filter(author=author.id)
-    paginator = Paginator(posts, settings.PAGE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    count = posts.count()
+    posts = Post.objects.feed().filter(author=author.id)
+    count = stats_for(author).posts_count
     following = (request.user.is_authenticated and Follow.objects.filter(
         user=request.user,
         author=author).exists())
+    tag = page_etag(
+        request, generation(f'author:{author.pk}'), author.get_full_name(),
+        count, following,
+    )
+    response = not_modified(request, tag)
+    if response:
+        return response
+    page_obj = cached_paginate(request, posts, f'author:{author.pk}')
     context = {
         'author': author,
         'page_obj': page_obj,
         'count': count,
         'following': following
     }
+    response = render(request, template, context)
+    response['ETag'] = tag
+    return response
+
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    template = 'posts/search.html'
+    page_obj = None
+    if query:
+        page_obj = paginate(request, find_posts(query), keys=SEARCH_KEYS)
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+        'page_query': '&' + urlencode({'q': query}),
+    }
     return render(request, template, context)
 
 
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'), pk=post_id
+    )
+    count = stats_for(post.author).posts_count
+    tag = page_etag(
+        request, post.pk, post.version, post.author.get_full_name(), count
+    )
+    response = not_modified(request, tag)
+    if response:
+        return response
     form = CommentForm()
-    comments = post.comments.all().select_related('author')
+    chunk = comments_chunk(post)
     template = 'posts/post_detail.html'
-    count = Post.objects.filter(author__username=post.author).count()
     context = {
         'post': post,
         'count': count,
-        'comments': comments,
+        'comments': chunk.object_list,
+        'next_cursor': chunk.next_cursor,
         'form': form,
     }
-    return render(request, template, context)
+    response = render(request, template, context)
+    response['ETag'] = tag
+    return response
+
+
+def comments_paginator(post):
+    return CursorPaginator(
+        post.comments.select_related('author'), settings.COMMENTS_PAGE
+    )
+
+
+def comments_chunk(post, cursor=None):
+    return comments_paginator(post).get_chunk(cursor)
+
+
+def post_comments(request, post_id):
+    """The comments after ``?cursor=`` as an HTML fragment."""
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    chunk = comments_chunk(post, request.GET.get('cursor'))
+    context = {
+        'post': post,
+        'comments': chunk.object_list,
+        'next_cursor': chunk.next_cursor,
+    }
+    return render(request, 'includes/comments.html', context)
 
 
 @login_required()
@@ -82,7 +154,9 @@ def post_create(request):
     if form.is_valid():
         post = form.save(commit=False)
         post.author = request.user
-        form.save()
+        with transaction.atomic():
+            form.save()
+            transaction.on_commit(lambda: thumbnails.enqueue(post))
         return redirect('posts:profile', request.user.username)
     return render(request, template, {'form': form})
 
@@ -100,6 +174,8 @@ def post_edit(request, post_id):
         )
         if form.is_valid():
             post = form.save()
+            if 'image' in form.changed_data:
+                transaction.on_commit(lambda: thumbnails.enqueue(post))
             return redirect('posts:post_detail', post.id)
         context = {
             'form': form,
@@ -117,17 +193,16 @@ def add_comment(request, post_id):
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
-        comment.save()
+        with transaction.atomic():
+            comment.save()
     return redirect('posts:post_detail', post_id=post_id)
 
 
 @login_required
 def follow_index(request):
-    follow_posts = Post.objects.filter(author__following__user=request.user)
+    follow_posts = followed_posts(request.user)
     template = 'posts/follow.html'
-    paginator = Paginator(follow_posts, settings.PAGE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginate(request, follow_posts, keys=FEED_KEYS)
     context = {
         'page_obj': page_obj,
     }
@@ -136,18 +211,38 @@ def follow_index(request):
 
 @login_required
 def profile_follow(request, username):
-    if request.user == get_object_or_404(User, username=username):
-        return redirect('posts:follow_index')
-    else:
-        Follow.objects.get_or_create(
-            user=request.user,
-            author=get_object_or_404(User, username=username)
-        )
-        return redirect('posts:follow_index')
+    author = get_object_or_404(User, username=username)
+    if request.user != author:
+        with transaction.atomic():
+            Follow.objects.get_or_create(user=request.user, author=author)
+    return redirect('posts:follow_index')
 
 
 @login_required
 def profile_unfollow(request, username):
     follower = get_object_or_404(User, username=username)
-    Follow.objects.filter(user=request.user, author=follower).delete()
+    with transaction.atomic():
+        Follow.objects.filter(user=request.user, author=follower).delete()
     return redirect('posts:follow_index')
+
+
+@staff_member_required
+def export_content(request):
+    fmt = request.GET.get('format', 'ndjson')
+    after_id = request.GET.get('after_id')
+    try:
+        chunks = export.stream(
+            request.GET.getlist('kind'),
+            fmt,
+            since=export.parse_since(request.GET.get('since')),
+            after_id=int(after_id) if after_id else None,
+        )
+    except ValueError as error:
+        return HttpResponseBadRequest(str(error))
+    response = StreamingHttpResponse(
+        chunks, content_type=f'{export.FORMATS[fmt]}; charset=utf-8'
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="yatube-export.{fmt}"'
+    )
+    return response
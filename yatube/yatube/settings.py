@@ -34,11 +34,14 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
     'sorl.thumbnail',
 ]
 
 MIDDLEWARE = [
+    'core.metrics.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.replicas.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -49,6 +52,8 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'yatube.urls'
 
+TEST_RUNNER = 'core.runner.TestRunner'
+
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
@@ -75,10 +80,39 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'core.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': int(os.getenv('YATUBE_DB_CONN_MAX_AGE', 60)),
+        'OPTIONS': {
+            # Seconds a writer waits for the lock before giving up.
+            'timeout': 20,
+        },
     }
 }
+# Applied to every new connection of core.backends.sqlite3.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'temp_store': 'memory',
+}
+
+# Read-only copies of the primary database, as comma separated SQLite
+# paths; safe requests read from them, see core.replicas.
+DATABASE_REPLICAS = []
+for number, name in enumerate(
+    filter(None, os.getenv('YATUBE_DB_REPLICAS', '').split(',')), start=1
+):
+    DATABASES[f'replica{number}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': name.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica{number}')
+DATABASE_ROUTERS = ['core.replicas.PrimaryReplicaRouter']
+# Clients keep reading from the primary this long after a write.
+REPLICA_PIN_SECONDS = 10
 
 
 # Password validation
@@ -130,13 +164,102 @@ LOGIN_REDIRECT_URL = 'posts:index'
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+# locmem keeps a private cache per process; redis or memcached share one
+# cache between all workers. YATUBE_CACHE_TWO_TIER adds a short-lived
+# in-process LRU in front of the shared cache. The memcached backend
+# needs python-memcached.
+CACHE_BACKEND = os.getenv('YATUBE_CACHE_BACKEND', 'locmem')
+CACHE_LOCATION = os.getenv('YATUBE_CACHE_LOCATION')
+CACHE_TWO_TIER = os.getenv('YATUBE_CACHE_TWO_TIER', '') == '1'
+
+SHARED_CACHES = {
+    'redis': {
+        'BACKEND': 'core.cache.RedisCache',
+        'LOCATION': CACHE_LOCATION or '127.0.0.1:6379',
+        'KEY_PREFIX': 'yatube',
+        'OPTIONS': {
+            'DB': int(os.getenv('YATUBE_CACHE_DB', 0)),
+            'MAX_CONNECTIONS': 20,
+            'SOCKET_TIMEOUT': 1,
+        },
+    },
+    'memcached': {
+        'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+        'LOCATION': CACHE_LOCATION or '127.0.0.1:11211',
+        'KEY_PREFIX': 'yatube',
+    },
 }
 
+if CACHE_BACKEND == 'locmem':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+elif CACHE_TWO_TIER:
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.cache.TwoTierCache',
+            'OPTIONS': {
+                'SHARED': 'shared',
+                'LOCAL_TIMEOUT': 5,
+                'LOCAL_MAX_ENTRIES': 5000,
+                'BYPASS_PREFIXES': ['feed_gen:', 'timeline:'],
+            },
+        },
+        'shared': SHARED_CACHES[CACHE_BACKEND],
+    }
+else:
+    CACHES = {'default': SHARED_CACHES[CACHE_BACKEND]}
+
 PAGE = 10
+# post_detail shows this many comments, the rest load in chunks this size.
+COMMENTS_PAGE = 20
+# JSON API chunk size, the most a client may ask for with limit=, and
+# the most posts fetched by one batch request.
+API_PAGE = 20
+API_PAGE_MAX = 100
+API_BATCH_SIZE = 100
+# Most changes returned by one sync poll, and how long they are kept.
+SYNC_LIMIT = 500
+CHANGE_LOG_DAYS = 30
+# Numbered pages stop after this many posts, cursors go further.
+PAGINATOR_COUNT_LIMIT = 10000
+# Feeds longer than this cache their size.
+APPROXIMATE_COUNT_THRESHOLD = 1000
+APPROXIMATE_COUNT_TIMEOUT = 60 * 5
 CHARS_LIMIT = 15
+# Feeds show this many words of a post. Stored excerpts follow a change
+# when their post is saved again.
+EXCERPT_WORDS = 50
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
+
+# Authors with more followers than this are not fanned out on write;
+# their posts are merged into follow feeds on read instead.
+FANOUT_FOLLOWERS_LIMIT = 5000
+# SQLite inserts at most 500 rows per statement.
+FANOUT_BATCH_SIZE = 500
+TIMELINE_BACKFILL = 500
+
+POST_CARD_TIMEOUT = 60 * 60 * 24
+FEED_CACHE_TIMEOUT = 60 * 60 * 6
+
+# Rows fetched per query and written per chunk by exports.
+EXPORT_CHUNK_SIZE = 2000
+
+# Request timings in Server-Timing headers and, for clients sending
+# "Authorization: Bearer <token>", at /metrics/. Without a token the
+# endpoint answers 404 to everyone.
+PERF_METRICS = os.getenv('YATUBE_PERF_METRICS', '') == '1'
+PERF_METRICS_TOKEN = os.getenv('YATUBE_PERF_METRICS_TOKEN', '')
+INTERNAL_IPS = ['127.0.0.1']
+
+# Thumbnails rendered by the templates; generated in a process pool of
+# THUMBNAIL_WORKERS right after upload (0 generates them in the request).
+POST_THUMBNAILS = [
+    ('960x339', {'crop': 'center', 'upscale': True}),
+]
+THUMBNAIL_WORKERS = int(os.getenv(
+    'YATUBE_THUMBNAIL_WORKERS', min(os.cpu_count() or 1, 4)
+))